@@ -1,10 +1,12 @@
 from distutils.core import setup
 
+from snekbol import __version__
+
 
 setup(
     name = 'snekbol',
     packages = ['snekbol'],
-    version = '0.1.1',
+    version = __version__,
     description = 'A python based library for reading and writing SBOL 2 files',
     author = 'Thomas Craig',
     author_email = 'thomas.craig@tjc.me.uk',
@@ -15,6 +17,9 @@ setup(
         'rdflib==4.2.2',
         'validators==0.11.2',
     ],
+    extras_require = {
+        'packed': ['numpy'],
+    },
     classifiers = [
         'Development Status :: 3 - Alpha',
         'Intended Audience :: Science/Research',
@@ -1,6 +1,6 @@
 from lxml import etree as ET
 
-from .identified import Identified
+from .identified import Identified, Owned
 from .namespaces import NS
 
 
@@ -14,7 +14,7 @@ class QName(object):
         self.prefix = prefix
 
 
-class Annotation(object):
+class Annotation(Owned):
     def __init__(self,
                  q_name,
                  annotation_value,
@@ -28,7 +28,7 @@ class Annotation(object):
         return annotation
 
 
-class AnnotationValue(object):
+class AnnotationValue(Owned):
     def __init__(self,
                  literal=None,
                  uri=None,
@@ -47,7 +47,7 @@ class AnnotationValue(object):
             annotation.text = self.literal
 
 
-class NestedAnnotation(object):
+class NestedAnnotation(Owned):
     def __init__(self,
                  nested_q_name,
                  nested_uri,
@@ -8,6 +8,9 @@ class Collection(TopLevel):
     """
     Groups together a set of TopLevel objects that have something in common
     """
+    __slots__ = ('_members',)
+    _reference_attributes = ('_members',)
+
     def __init__(self,
                  identity,
                  members=[],
@@ -17,7 +20,7 @@ class Collection(TopLevel):
 
     @property
     def members(self):
-        return self._members
+        return self._list('_members')
 
     @members.setter
     def members(self, value):
@@ -30,7 +33,7 @@ class Collection(TopLevel):
         collection = ET.Element(NS('sbol', 'Collection'), attrib={NS('rdf', 'about'):
                                                                   self.rdf_identity})
         collection.extend(elements)
-        for m in self.members:
+        for m in self._members:
             member = ET.SubElement(collection, NS('sbol', 'member'),
                                    attrib={NS('rdf', 'resource'): m._get_identity(ns)})
         return collection
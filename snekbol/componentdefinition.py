@@ -1,10 +1,12 @@
+from operator import attrgetter
 from lxml import etree as ET
 
 from rdflib import Namespace, URIRef, Literal, RDF, RDFS, BNode
-import validators
 
 from .identified import TopLevel
 from .sequence import Sequence
+from .location import Range, Cut
+from .intervals import IntervalIndex
 from .types import *
 from .namespaces import SBOL, NS
 
@@ -13,6 +15,11 @@ class ComponentDefinition(TopLevel):
     """
     The ComponentDefinition class represents the structural entities of a biological design
     """
+    __slots__ = ('_types', '_roles', '_sequences', '_components', '_sequence_annotations',
+                 '_sequence_constraints', '_children_loader', '_location_index',
+                 '_component_order', '_flattened')
+    _reference_attributes = ('_sequences',)
+    _index_attributes = (('role', '_roles'), ('type', '_types'))
 
     def __init__(self,
                  identity,
@@ -26,6 +33,9 @@ class ComponentDefinition(TopLevel):
                  sequence_constraints=[],
                  **kwargs):
         super().__init__(identity, **kwargs)
+        object.__setattr__(self, '_location_index', None)
+        object.__setattr__(self, '_component_order', None)
+        object.__setattr__(self, '_flattened', None)
 
         self._types = []
         self._roles = []
@@ -33,6 +43,8 @@ class ComponentDefinition(TopLevel):
         self._components = []
         self._sequence_annotations = []
         self._sequence_constraints = []
+        # Builds components, sequence annotations and constraints on first use when read lazily
+        self._children_loader = None
 
         self.roles = roles
         self.sequences = sequences
@@ -63,7 +75,7 @@ class ComponentDefinition(TopLevel):
 
     @property
     def types(self):
-        return self._types
+        return self._list('_types')
 
     @types.setter
     def types(self, value):
@@ -74,7 +86,7 @@ class ComponentDefinition(TopLevel):
 
     @property
     def roles(self):
-        return self._roles
+        return self._list('_roles')
 
     @roles.setter
     def roles(self, value):
@@ -85,13 +97,121 @@ class ComponentDefinition(TopLevel):
 
     @property
     def sequences(self):
-        return self._sequences
+        return self._list('_sequences')
 
     @sequences.setter
     def sequences(self, value):
         if not isinstance(value, list):
             raise Exception('Must provide a list of sequences')
         self._sequences = value
+        object.__setattr__(self, '_flattened', None)
+
+    @property
+    def components(self):
+        self._load_children()
+        return self._list('_components')
+
+    @components.setter
+    def components(self, value):
+        self._load_children()
+        self._components = value
+
+    @property
+    def sequence_annotations(self):
+        self._load_children()
+        return self._list('_sequence_annotations')
+
+    @sequence_annotations.setter
+    def sequence_annotations(self, value):
+        self._load_children()
+        self._sequence_annotations = value
+        object.__setattr__(self, '_location_index', None)
+        object.__setattr__(self, '_component_order', None)
+        object.__setattr__(self, '_flattened', None)
+
+    @property
+    def sequence_constraints(self):
+        self._load_children()
+        return self._list('_sequence_constraints')
+
+    @sequence_constraints.setter
+    def sequence_constraints(self, value):
+        self._load_children()
+        self._sequence_constraints = value
+
+    @property
+    def children_loaded(self):
+        return self._children_loader is None
+
+    def _defer_children(self, loader):
+        """
+        Build components, sequence annotations and constraints by calling loader when first used
+        """
+        self._children_loader = loader
+
+    def _load_children(self):
+        if self._children_loader is not None:
+            loader, self._children_loader = self._children_loader, None
+            loader()
+
+    def __getstate__(self):
+        # The loader holds the document that read this definition, so it is never pickled
+        self._load_children()
+        return super().__getstate__()
+
+    def _drop_cached(self):
+        super()._drop_cached()
+        object.__setattr__(self, '_location_index', None)
+        object.__setattr__(self, '_component_order', None)
+        object.__setattr__(self, '_flattened', None)
+
+    @property
+    def location_index(self):
+        """
+        IntervalIndex of the sequence annotations by their Range and Cut locations
+
+        Built when first used and dropped when the definition, its annotations or their
+        locations change. A Cut at n is indexed as the single position n.
+        """
+        if self._location_index is None:
+            intervals = []
+            for annotation in self.sequence_annotations:
+                for location in annotation._locations:
+                    if isinstance(location, Range):
+                        intervals.append((location.position, int(location.end), annotation))
+                    elif isinstance(location, Cut):
+                        intervals.append((location.position, location.position, annotation))
+            object.__setattr__(self, '_location_index', IntervalIndex(intervals))
+        return self._location_index
+
+    def overlapping(self, start, end):
+        """
+        Sequence annotations with a location overlapping start..end (inclusive)
+        """
+        return list(dict.fromkeys(self.location_index.overlapping(start, end)))
+
+    def containing(self, position):
+        """
+        Sequence annotations with a location that includes position
+        """
+        return list(dict.fromkeys(self.location_index.containing(position)))
+
+    def nearest(self, position):
+        """
+        Sequence annotation with the location closest to position, None if there are none
+        """
+        return self.location_index.nearest(position)
+
+    def ordered_components(self):
+        """
+        Components of the sequence annotations ordered by their first location
+
+        The order is kept until the definition, its annotations or their locations change.
+        """
+        if self._component_order is None:
+            annotations = sorted(self.sequence_annotations, key=attrgetter('first_location'))
+            object.__setattr__(self, '_component_order', tuple(a.component for a in annotations))
+        return list(self._component_order)
 
     def participate(self, participant):
         """
@@ -104,23 +224,24 @@ class ComponentDefinition(TopLevel):
         component_definition = ET.Element(NS('sbol', 'ComponentDefinition'),
                                           attrib={NS('rdf', 'about'): self.rdf_identity})
         component_definition.extend(elements)
+        self._load_children()
 
-        for r in self.roles:
+        for r in self._roles:
             component_definition.append(ET.Element(NS('sbol', 'role'),
                                         attrib={NS('rdf', 'resource'): r}))
-        for t in self.types:
+        for t in self._types:
             component_definition.append(ET.Element(NS('sbol', 'type'),
                                         attrib={NS('rdf', 'resource'): t}))
 
-        for c in sorted(self.components, key=lambda x: x.identity):
+        for c in sorted(self._components, key=lambda x: x.identity):
             component_container = ET.Element(NS('sbol', 'component'))
             component_container.append(c._as_rdf_xml(ns))
             component_definition.append(component_container)
-        for s in sorted(self.sequence_annotations, key=lambda x: x.identity):
+        for s in sorted(self._sequence_annotations, key=lambda x: x.identity):
             component_definition.append(s._as_rdf_xml(ns))
-        for s in sorted(self.sequence_constraints, key=lambda x: x.identity):
+        for s in sorted(self._sequence_constraints, key=lambda x: x.identity):
             component_definition.append(s._as_rdf_xml(ns))
-        for s in sorted(self.sequences, key=lambda x: x.identity):
+        for s in sorted(self._sequences, key=lambda x: x.identity):
             component_definition.append(ET.Element(NS('sbol', 'sequence'),
                                                    attrib={NS('rdf', 'resource'):
                                                            s._get_identity(ns)}))
@@ -2,7 +2,7 @@ from lxml import etree as ET
 
 from rdflib import Namespace, URIRef, Literal, RDF, RDFS
 
-from .identified import Identified
+from .identified import Identified, ListAttribute
 from .types import *
 from .namespaces import SBOL, NS
 
@@ -11,6 +11,11 @@ class ComponentInstance(Identified):
     """
     Mixin for use in nesting component definitions
     """
+    __slots__ = ('_access', 'definition', '_maps_to')
+    _reference_attributes = ('definition',)
+
+    maps_to = ListAttribute('_maps_to')
+
     def __init__(self,
                  identity,
                  definition,
@@ -42,8 +47,8 @@ class ComponentInstance(Identified):
         elements.append(ET.Element(NS('sbol', 'definition'),
                                    attrib={NS('rdf', 'resource'):
                                            self.definition._get_identity(ns)}))
-        if self.maps_to is not None:
-            for m in self.maps_to:
+        if self._maps_to is not None:
+            for m in self._maps_to:
                 elements.append(m._as_rdf_xml(ns))
         return elements
 
@@ -67,6 +72,9 @@ class Component(ComponentInstance):
     """
     Compose ComponentDefinition objects into a structural hierarchy
     """
+    __slots__ = ('roles', 'role_integration')
+    _index_attributes = (('role', 'roles'),)
+
     def __init__(self,
                  identity,
                  definition,
@@ -102,6 +110,8 @@ class FunctionalComponent(ComponentInstance):
     """
     An instance of a ComponentDefinition being used as part of a ModuleDefinition
     """
+    __slots__ = ('direction',)
+
     def __init__(self,
                  identity,
                  definition,
@@ -130,6 +140,9 @@ class MapsTo(Identified):
     """
     Provide relationship data between ComponentDefinition and ModuleDefinition objects
     """
+    __slots__ = ('local', 'remote', '_refinement')
+    _reference_attributes = ('local', 'remote')
+
     def __init__(self,
                  identity,
                  local,
@@ -0,0 +1,105 @@
+import hashlib
+
+from .packed import PackedSequence
+from .sequencestore import MappedSequence
+
+
+def content_digest(*parts):
+    """
+    Digest of the characters of sequence elements joined from parts, without joining them
+
+    Parts may be str, PackedSequence or MappedSequence, and elements with the same characters
+    have the same digest however they are stored.
+    """
+    digest = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        if isinstance(part, PackedSequence):
+            digest.update(part.to_bytes())
+        elif isinstance(part, MappedSequence):
+            for chunk in part.iter_bytes():
+                digest.update(chunk)
+        else:
+            digest.update(str(part).encode('utf-8'))
+    return digest.digest()
+
+
+class ContentStore(object):
+    """
+    Sequence elements by the digest of their content, so each distinct content is held once
+
+    Sequences with the same content share the elements object held for it, whether that is a
+    str, PackedSequence or MappedSequence. The digests of held objects are kept by id, so
+    looking one up again does not read its content. Each content is held for a set of holders,
+    usually Sequence identities, and is dropped once all of them have released it.
+    """
+    def __init__(self):
+        self._elements = {}
+        # id(elements) -> digest of each held elements object
+        self._digests = {}
+        # Number of holders of each digest, and the digest each holder holds
+        self._counts = {}
+        self._holders = {}
+
+    def __len__(self):
+        return len(self._elements)
+
+    def __getstate__(self):
+        return {'_elements': self._elements, '_counts': self._counts, '_holders': self._holders}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._digests = {id(elements): digest for digest, elements in self._elements.items()}
+
+    def digest(self, elements):
+        """
+        Digest of the content of elements, see content_digest
+        """
+        digest = self._digests.get(id(elements))
+        if digest is not None and self._elements.get(digest) is elements:
+            return digest
+        return content_digest(elements)
+
+    def get(self, digest):
+        """
+        Elements held for digest, None if there are none
+        """
+        return self._elements.get(digest)
+
+    def add(self, digest, elements, holder):
+        """
+        Hold the content with digest for holder, returns the elements held for it
+
+        elements are held unless other elements already are. A holder holds one content at a
+        time, adding it again with another digest releases the content it held before.
+        """
+        previous = self._holders.get(holder)
+        if previous == digest:
+            return self._elements[digest]
+        if previous is not None:
+            self.release(holder)
+        held = self._elements.setdefault(digest, elements)
+        if held is elements:
+            self._digests[id(elements)] = digest
+        self._counts[digest] = self._counts.get(digest, 0) + 1
+        self._holders[holder] = digest
+        return held
+
+    def release(self, holder):
+        """
+        Release the content held for holder, its elements are dropped if no other holder has it
+        """
+        digest = self._holders.pop(holder, None)
+        if digest is None:
+            return
+        count = self._counts.pop(digest) - 1
+        if count > 0:
+            self._counts[digest] = count
+        else:
+            elements = self._elements.pop(digest)
+            self._digests.pop(id(elements), None)
+
+    def clear(self):
+        self._elements.clear()
+        self._digests.clear()
+        self._counts.clear()
+        self._holders.clear()
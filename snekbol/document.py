@@ -1,15 +1,20 @@
-from operator import attrgetter
+import os
+import re
+from collections import ChainMap
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+from itertools import chain, product
 from urllib.parse import urljoin
 from pprint import pprint
 from lxml import etree as ET
 
 from rdflib import Graph, Namespace, URIRef, Literal, RDF
-from rdflib.namespace import DCTERMS, split_uri
+from rdflib.namespace import DCTERMS
 
-import validators
-
-from .identified import GenericTopLevel
-from .namespaces import SBOL, PROV, XML_NS, NS, VALID_ENTITIES
+from .identified import Identified, GenericTopLevel
+from .types import (ROLES, PARTICIPANT_TYPES, VALID_COMPONENT_TYPES, INTERACTION_TYPES,
+                    ENCODING_URI)
+from .namespaces import SBOL, PROV, XML_NS, NS, NamespaceResolver
 from .componentdefinition import ComponentDefinition
 from .components import Component, FunctionalComponent, MapsTo
 from .sequence import Sequence, SequenceAnnotation, SequenceConstraint
@@ -17,6 +22,71 @@ from .location import Range, Cut, GenericLocation
 from .model import Model, Module, ModuleDefinition, Interaction, Participation
 from .annotation import QName, Annotation, AnnotationValue, NestedAnnotation
 from .collection import Collection
+from .uri import is_url
+from .uritable import URITable
+from .identityindex import IdentityIndex
+from .kmerindex import KmerIndex
+from .stream import StreamReader, ForwardReferences
+from .subjectindex import SubjectIndex
+from .snapshot import snapshot_key, snapshot_path, load_snapshot, save_snapshot
+from .packed import PackedSequence
+from .sequencestore import PLACEHOLDER_PATTERN
+from .contentstore import ContentStore, content_digest
+
+# How an identity that is already in the document is handled when appending or merging files
+CONFLICT_POLICIES = ('error', 'skip', 'replace', 'newest')
+
+# Stores filled in while reading, TopLevel objects first
+TOP_LEVEL_STORES = ('_components', '_sequences', '_models', '_modules', '_collections',
+                    '_annotations')
+READ_STORES = TOP_LEVEL_STORES + ('_functional_component_store', '_collection_store')
+# TopLevel stores in the order they are written
+WRITE_STORES = ('_sequences', '_components', '_models', '_modules', '_collections',
+                '_annotations')
+# TopLevel stores in the order they are indexed, so a subject read both as a generic TopLevel
+# object and as a core SBOL object is found as the latter
+INDEX_STORES = ('_annotations', '_collections', '_modules', '_models', '_sequences',
+                '_components')
+# Predicates from a ComponentDefinition to the children _extend_component_definition reads
+CHILD_PREDICATES = (SBOL.component, SBOL.sequenceAnnotation, SBOL.SequenceAnnotation,
+                    SBOL.sequenceConstraint, SBOL.SequenceConstraint)
+# Filters taken by Document.query, with the tables short names given to each are looked up in
+QUERY_FILTERS = {
+    'role': (ROLES, PARTICIPANT_TYPES),
+    'type': (VALID_COMPONENT_TYPES, INTERACTION_TYPES),
+    'encoding': (ENCODING_URI,),
+    'annotation': (),
+    'namespace': (),
+}
+
+
+def _version_key(version):
+    """
+    Sort key for version strings such as 1.0 or 2-alpha, no version sorts first
+    """
+    if version is None:
+        return ()
+    return tuple((0, int(part), '') if part.isdigit() else (1, 0, part)
+                 for part in re.split('[._-]', str(version)))
+
+
+def _keep_incoming(on_conflict, identity, existing_version, incoming_version):
+    """
+    Apply a conflict policy to an identity that is already defined, True keeps the new object
+    """
+    if on_conflict == 'skip':
+        return False
+    elif on_conflict == 'replace':
+        return True
+    elif on_conflict == 'newest':
+        return _version_key(incoming_version) > _version_key(existing_version)
+    raise ValueError("{} has already been defined".format(identity))
+
+
+def _check_conflict_policy(on_conflict):
+    if on_conflict not in CONFLICT_POLICIES:
+        raise ValueError('Conflict policy must be one of {}'.format(', '.join(CONFLICT_POLICIES)))
+
 
 class Document(object):
     """
@@ -24,7 +94,9 @@ class Document(object):
     """
     def __init__(self,
                  namespace,
-                 validate=True):
+                 validate=True,
+                 pack_sequences=False,
+                 sequence_store=None):
 
         # Don't access directly: use function getter/setters
         self._components = {}
@@ -39,12 +111,31 @@ class Document(object):
         # in data from a file
         self._functional_component_store = {}
         self._collection_store = {}
+        # Set while reading with the stream engine
+        self._forward_references = None
+        # Set while appending, see CONFLICT_POLICIES
+        self._on_conflict = None
+        # Set while reading to defer building ComponentDefinition children until first use
+        self._lazy_read = False
+        self._namespace_resolver = NamespaceResolver()
+        # Every URI read into the document, shared by the objects that use it
+        self._uris = URITable()
+        # Every object in the document by identity, see find
+        self._identities = IdentityIndex()
+        # Where k-mers occur in the elements of each Sequence, see search_sequences
+        self._kmers = KmerIndex()
+        # Elements of the sequences in the document by content, see duplicate_sequences
+        self._contents = ContentStore()
 
-        if validators.url(namespace):
+        if is_url(namespace):
             self.document_namespace = namespace
         else:
             raise Exception('Invalid namespace URI')
         self.validate = validate
+        # Store nucleotide sequences read or assembled as 2-bit PackedSequence objects
+        self.pack_sequences = pack_sequences
+        # MappedSequenceStore holding sequences of at least its threshold length outside memory
+        self.sequence_store = sequence_store
 
         # Create a document namesspace for use in RDF serialization
         self.ns = Namespace(self.document_namespace)
@@ -52,6 +143,37 @@ class Document(object):
     def __str__(self):
         return 'SBOL Document {{{}}}'.format(self.document_namespace)
 
+    def __getstate__(self):
+        # State only used while reading is rebuilt rather than pickled
+        state = self.__dict__.copy()
+        del state['_forward_references']
+        del state['_namespace_resolver']
+        # Mapped sequences are pickled as str, the side file stays with this document
+        state['sequence_store'] = None
+        state['_kmers'] = KmerIndex(self._kmers.k, self._kmers.max_expansions,
+                                    self._kmers.chunk_size)
+        # Indexes are rebuilt from the objects, so documents sent back by read_many workers
+        # only carry what was read
+        del state['_identities']
+        del state['_uris']
+        del state['_contents']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._forward_references = None
+        self._namespace_resolver = NamespaceResolver(self._namespaces)
+        self._uris = URITable()
+        # Unpickled TopLevel objects are not indexed, so find and the other lookups index them
+        # on first use
+        self._identities = IdentityIndex()
+        for obj in self._top_level_values():
+            self._identities.changed(obj)
+        self._contents = ContentStore()
+        for identity, sequence in self._sequences.items():
+            sequence.elements = self._contents.add(self._contents.digest(sequence.elements),
+                                                   sequence.elements, identity)
+
     def add_namespace(self, namespace, prefix):
         """
         Add a namespace to the document
@@ -83,15 +205,27 @@ class Document(object):
         # definition.identity = self._to_uri_from_namespace(definition.identity)
         if definition.identity not in self._components.keys():
             self._components[definition.identity] = definition
+            self._identities.add(definition)
         else:
             raise ValueError("{} has already been defined".format(definition.identity))
 
-    def remove_component_definition(self, identity):
+    def remove_component_definition(self, identity, safe=False):
         """
         Remove a ComponentDefinition from the document
-        """
+
+        With safe set a ValueError is raised instead if objects outside the definition still
+        refer to it or to anything it holds.
+        """
+        if safe and identity in self._components:
+            self._refresh_identities()
+            definition = self._components[identity]
+            users = sorted(str(referrer.identity) for referrer in
+                           self._referrers_of_top_level(definition, exclude={id(definition)}))
+            if len(users) > 0:
+                raise ValueError('{} is still referred to by {}'.format(identity,
+                                                                       ', '.join(users)))
         try:
-            self._components.pop(identity)
+            self._identities.remove(self._components.pop(identity))
         except KeyError:
             pass
 
@@ -111,6 +245,22 @@ class Document(object):
         """
         return self._components.values()
 
+    def list_sequences(self):
+        """
+        List of all Sequences in the document, see sequenceops for operations over them
+        """
+        return self._sequences.values()
+
+    def remove_sequence(self, identity):
+        """
+        Remove a Sequence from the document
+        """
+        try:
+            self._identities.remove(self._sequences.pop(identity))
+        except KeyError:
+            return
+        self._contents.release(identity)
+
     def assemble_component(self, into_component, using_components):
         """
         Assemble a list of already defined components into a structual hirearchy
@@ -118,54 +268,157 @@ class Document(object):
         if not isinstance(using_components, list) or len(using_components) == 0:
             raise Exception('Must supply list of ComponentDefinitions')
 
-        components = []
-        sequence_annotations = []
-        seq_elements = ''
-
-        for k, c in enumerate(using_components):
+        parts = []
+        for c in using_components:
             try:
                 self._components[c.identity]
             except KeyError:
                 raise Exception('Must already have defined ComponentDefinition in document')
             else:
-                identity = into_component.identity + '/' + c.identity
-
-                # All components are initially public, this can be changed later
-                component = Component(identity,
-                                      c,
-                                      'public',
-                                      display_id=c.identity)
-                components.append(component)
-
                 # If there is a sequence on the ComponentDefinition use the first element
                 if len(c.sequences) > 0:
                     # Add the sequence to the document
                     self._add_sequence(c.sequences[0])
-                    # Get start/end points of sequence
-                    start = len(seq_elements) + 1 # The sequence is usually 1 indexed
-                    end = start + len(c.sequences[0].elements)
-                    # Add to the component sequence element
-                    seq_elements += c.sequences[0].elements
-                    # Create a Range object to hold seq range
-                    range_identity = identity + '_sequence_annotation/range'
-                    seq_range = Range(range_identity, start, end, display_id='range')
-                    # Create a SequenceAnnotation object to hold the range
-                    annot_identity = identity + '_sequence_annotation'
-                    seq_annot = SequenceAnnotation(annot_identity,
-                                                   component=component,
-                                                   locations=[seq_range],
-                                                   display_id=c.identity + '_sequence_annotation')
-                    sequence_annotations.append(seq_annot)
-
-        if seq_elements != '':
-            seq_encoding = using_components[0].sequences[0].encoding
-            seq_identity = '{}_sequence'.format(into_component.identity)
-            seq = Sequence(seq_identity, seq_elements, encoding=seq_encoding)
+                parts.append(self._part_template(c))
+
+        seq = self._build_assembly(into_component, parts)
+        if seq is not None:
             self._add_sequence(seq)
+        if self._components.get(into_component.identity) is into_component:
+            self._identities.add(into_component)
+
+    def assemble_combinations(self, slots, identity='design', add=False):
+        """
+        Lazily assemble a design for each combination of one ComponentDefinition per slot
+
+        slots is a list of lists of ComponentDefinitions already in the document. Designs are
+        generated in the order of itertools.product as new ComponentDefinitions identity_1,
+        identity_2 and so on, each with its Sequence, and are only added to the document if
+        add is set. slots is checked and the sequences of the parts are added to the document
+        if they are not already in it when this is called, before any design is generated.
+        Each part is looked at once, so a library costs one Component, Range and
+        SequenceAnnotation per part of each design and the join of its sequence.
+        """
+        if not isinstance(slots, list) or len(slots) == 0 or \
+                any(not isinstance(slot, list) or len(slot) == 0 for slot in slots):
+            raise Exception('Must supply list of lists of ComponentDefinitions')
+
+        templates = {}
+        for slot in slots:
+            for c in slot:
+                if id(c) in templates:
+                    continue
+                if self._components.get(c.identity) is not c:
+                    raise Exception('Must already have defined ComponentDefinition in document')
+                if len(c.sequences) > 0 and c.sequences[0].identity not in self._sequences:
+                    self._add_sequence(c.sequences[0])
+                templates[id(c)] = self._part_template(c)
+        slots = [[templates[id(c)] for c in slot] for slot in slots]
+        return self._assemble_combinations(slots, identity, add)
+
+    def _assemble_combinations(self, slots, identity, add):
+        """
+        Generate the designs of assemble_combinations from slots of part templates
+        """
+        for n, parts in enumerate(product(*slots), 1):
+            design = ComponentDefinition('{}_{}'.format(identity, n))
+            seq = self._build_assembly(design, parts)
+            if add:
+                if seq is not None:
+                    self._add_sequence(seq)
+                self.add_component_definition(design)
+            yield design
+
+    def write_combinations(self, f, slots, identity='design', cache=False, workers=1):
+        """
+        Write the document with the designs of assemble_combinations added, one at a time
+
+        Designs, and their sequences, are written as they are generated and are not added to
+        the document, so the library is never held in memory.
+        """
+        def designs():
+            for design in self.assemble_combinations(slots, identity):
+                yield from design.sequences
+                yield design
+        self.write(f, cache=cache, workers=workers, extra=designs())
+
+    def _part_template(self, definition):
+        """
+        (ComponentDefinition, sequence elements or None, length) of a part used in assemblies
+        """
+        if len(definition.sequences) > 0:
+            elements = definition.sequences[0].elements
+            return definition, elements, len(elements)
+        return definition, None, 0
+
+    def _build_assembly(self, into_component, parts):
+        """
+        Fill in into_component from the part templates of the ComponentDefinitions it is made of
+
+        Returns the new Sequence of into_component, or None if no part has a sequence.
+        """
+        components = []
+        sequence_annotations = []
+        # Joined once at the end rather than concatenated part by part
+        seq_parts = []
+        seq_length = 0
+        encoding = None
+
+        for c, elements, length in parts:
+            identity = into_component.identity + '/' + c.identity
+
+            # All components are initially public, this can be changed later
+            component = Component(identity,
+                                  c,
+                                  'public',
+                                  display_id=c.identity)
+            components.append(component)
+
+            if elements is not None:
+                if encoding is None:
+                    encoding = c.sequences[0].encoding
+                # Get start/end points of sequence
+                start = seq_length + 1 # The sequence is usually 1 indexed
+                end = start + length
+                # Add to the component sequence element
+                seq_parts.append(elements)
+                seq_length += length
+                # Create a Range object to hold seq range
+                range_identity = identity + '_sequence_annotation/range'
+                seq_range = Range(range_identity, start, end, display_id='range')
+                # Create a SequenceAnnotation object to hold the range
+                annot_identity = identity + '_sequence_annotation'
+                seq_annot = SequenceAnnotation(annot_identity,
+                                               component=component,
+                                               locations=[seq_range],
+                                               display_id=c.identity + '_sequence_annotation')
+                sequence_annotations.append(seq_annot)
+
+        if seq_length > 0:
+            store = self.sequence_store
+            # Elements already in the document are shared rather than joined again
+            seq_elements = self._contents.get(content_digest(*seq_parts))
+            if seq_elements is None:
+                if store is not None and seq_length >= store.threshold:
+                    # Parts are copied into the side file one at a time
+                    seq_elements = store.add(seq_parts)
+                elif encoding == ENCODING_URI['DNA'] and (
+                        self.pack_sequences or any(isinstance(p, PackedSequence)
+                                                   for p in seq_parts)):
+                    # Only nucleotides are packed, as in Sequence.pack
+                    seq_elements = PackedSequence.concatenate(seq_parts)
+                else:
+                    seq_elements = ''.join(p if isinstance(p, str) else str(p)
+                                           for p in seq_parts)
+            seq_identity = '{}_sequence'.format(into_component.identity)
+            seq = Sequence(seq_identity, seq_elements, encoding=encoding)
             into_component.sequences.append(seq)
+        else:
+            seq = None
 
         into_component.components = components
         into_component.sequence_annotations = sequence_annotations
+        return seq
 
     def _add_sequence(self, sequence):
         """
@@ -173,15 +426,40 @@ class Document(object):
         """
         if sequence.identity not in self._sequences.keys():
             self._sequences[sequence.identity] = sequence
+            self._identities.add(sequence)
+            sequence.elements = self._contents.add(self._contents.digest(sequence.elements),
+                                                   sequence.elements, sequence.identity)
         else:
             raise ValueError("{} has already been defined".format(sequence.identity))
 
+    def _store_sequence(self, sequence, digest=None):
+        """
+        Keep sequence elements mapped, packed or as a str as set up for this document
+
+        Elements with the same content as those of a sequence already stored are shared, digest
+        is that of the elements if it is already known.
+        """
+        if digest is None:
+            digest = self._contents.digest(sequence.elements)
+        held = self._contents.get(digest)
+        if held is None:
+            store = self.sequence_store
+            if store is not None and len(sequence.elements) >= store.threshold:
+                sequence.spill(store)
+            elif self.pack_sequences:
+                sequence.pack()
+            else:
+                sequence.unpack()
+            held = sequence.elements
+        sequence.elements = self._contents.add(digest, held, sequence.identity)
+
     def add_model(self, model):
         """
         Add a model to the document
         """
         if model.identity not in self._models.keys():
             self._models[model.identity] = model
+            self._identities.add(model)
         else:
             raise ValueError("{} has already been defined".format(model.identity))
 
@@ -190,7 +468,7 @@ class Document(object):
         Remove a Model from the document
         """
         try:
-            self._models.pop(identity)
+            self._identities.remove(self._models.pop(identity))
         except KeyError:
             pass
 
@@ -198,14 +476,19 @@ class Document(object):
         """
         Get a Model for the document
         """
-        pass
+        try:
+            model = self._models[uri]
+        except KeyError:
+            return None
+        return model
 
     def add_module_definition(self, module_definition):
         """
         Add a ModuleDefinition to the document
         """
-        if module_definition.identity not in self._module_definitions.keys():
-            self._module_definitions[module_definition.identity] = module_definition
+        if module_definition.identity not in self._modules.keys():
+            self._modules[module_definition.identity] = module_definition
+            self._identities.add(module_definition)
         else:
             raise ValueError("{} has already been defined".format(module_definition.identity))
 
@@ -214,7 +497,7 @@ class Document(object):
         Remove a ModuleDefinition from the document
         """
         try:
-            self._module_definitions.pop(identity)
+            self._identities.remove(self._modules.pop(identity))
         except KeyError:
             pass
 
@@ -222,13 +505,169 @@ class Document(object):
         """
         Get a ModuleDefinition from the document
         """
-        pass
+        try:
+            module_definition = self._modules[uri]
+        except KeyError:
+            return None
+        return module_definition
 
     def find(self, uri):
         """
-        Recursivly search document for URI
+        Find the object with identity uri anywhere in the document
+
+        Returns the object and the objects holding it, innermost first, or None if there is no
+        such object. Top level objects and the objects they hold are indexed as they are read or
+        added. Objects added to a top level object after that are indexed when a uri is not
+        found, which also builds the children of ComponentDefinitions read lazily.
+        """
+        entry = self._identities.get(uri)
+        if entry is None:
+            self._refresh_identities()
+            entry = self._identities.get(uri)
+            if entry is None:
+                return None
+
+        obj, top_level = entry
+        parents = []
+        if top_level is not None:
+            parent = obj._parent
+            while parent is not top_level:
+                parents.append(parent)
+                parent = parent._parent
+            parents.append(top_level)
+        return obj, parents
+
+    def referrers(self, uri):
         """
-        pass
+        Objects in the document that refer to the object with identity uri
+
+        These are the objects holding a reference to it, such as the Component using a
+        ComponentDefinition or the Participation of a FunctionalComponent, not the top level
+        objects holding them.
+        """
+        self._refresh_identities()
+        return [referrer for referrer, top_level in self._identities.referrers(uri)]
+
+    def dependents(self, uri, depth=None):
+        """
+        Top level objects that depend on the object with identity uri, nearest first
+
+        A top level object depends on uri if it or an object it holds refers to uri, and on
+        everything its dependencies depend on up to depth levels (all levels if None).
+        References to objects held by a top level object count as references to it, so the
+        top level object holding uri is included when other objects it holds refer to uri.
+        """
+        self._refresh_identities()
+        entry = self._identities.get(uri)
+        if entry is None:
+            return []
+        obj, top_level = entry
+        seen = {id(obj)}
+        if top_level is None:
+            referrers = self._referrers_of_top_level(obj)
+        else:
+            referrers = (referrer_top for referrer, referrer_top in self._identities.referrers(uri))
+
+        found = []
+        level = 0
+        while depth is None or level < depth:
+            current = []
+            for dependent in referrers:
+                if id(dependent) not in seen:
+                    seen.add(id(dependent))
+                    current.append(dependent)
+            if len(current) == 0:
+                break
+            found.extend(current)
+            referrers = [referrer for dependent in current
+                         for referrer in self._referrers_of_top_level(dependent)]
+            level += 1
+        return found
+
+    def query(self, cls=Identified, **filters):
+        """
+        Objects in the document that are instances of cls and match every filter, by identity
+
+        The filters are role, type (of ComponentDefinitions and Interactions), encoding,
+        annotation (the namespace and local name of an annotation) and namespace (an identity
+        up to its last / or #). Each takes a value or a list of values any of which may match.
+        Short names such as 'Promoter' or 'circular' are looked up in the tables of types.py.
+        For example query(ComponentDefinition, role='Promoter', type=['circular', 'linear']).
+        """
+        for key in filters:
+            if key not in QUERY_FILTERS:
+                raise ValueError('Unknown query filter "{}", must be one of {}'.format(
+                    key, ', '.join(QUERY_FILTERS)))
+        self._refresh_identities()
+
+        matches = []
+        for key, values in filters.items():
+            if not isinstance(values, (list, tuple, set, frozenset)):
+                values = [values]
+            found = set()
+            for value in values:
+                uris = {table[value] for table in QUERY_FILTERS[key] if value in table}
+                for uri in uris or [value]:
+                    found.update(self._identities.matching(key, uri))
+            matches.append(found)
+        # Intersect starting from the smallest set, the class is checked on the result
+        matches.sort(key=len)
+        if len(matches) == 0:
+            result = self._identities.instances(cls)
+        else:
+            result = set(matches[0])
+            for found in matches[1:]:
+                result.intersection_update(found)
+            result = {obj for obj in result if isinstance(obj, cls)}
+        return sorted(result, key=lambda obj: str(obj.identity))
+
+    def search_sequences(self, motif):
+        """
+        (Sequence identity, position, strand) of each occurrence of an IUPAC nucleotide motif
+
+        Both strands are searched, a hit of the reverse complement of motif has strand '-'.
+        Positions are 1-based and give the first base of the hit on the sequence as written.
+        The k-mer index is built on the first search and only sequences added or changed since
+        are indexed again, see KmerIndex.
+        """
+        self._kmers.sync(self._sequences.values())
+        return self._kmers.search(motif)
+
+    def duplicate_sequences(self):
+        """
+        Sorted lists of the identities of Sequences in the document with the same elements
+
+        Sequences read or added to the document share one elements object per content, so this
+        is a lookup of the digest of each. Sequences given new elements since are shared too, and
+        the content they had before is released.
+        """
+        groups = {}
+        for identity, sequence in self._sequences.items():
+            digest = self._contents.digest(sequence.elements)
+            sequence.elements = self._contents.add(digest, sequence.elements, identity)
+            groups.setdefault(digest, []).append(sequence.identity)
+        return sorted(sorted(group) for group in groups.values() if len(group) > 1)
+
+    def _referrers_of_top_level(self, top_level, exclude=()):
+        """
+        Top level objects referring to top_level or an object it holds, other than exclude
+        """
+        referrers = {}
+        identity = top_level.identity
+        for key in [identity] + self._identities.held(identity):
+            for referrer, referrer_top in self._identities.referrers(key):
+                if id(referrer_top) not in exclude:
+                    referrers[id(referrer_top)] = referrer_top
+        return list(referrers.values())
+
+    def _refresh_identities(self):
+        """
+        Index objects added or changed since their top level objects were indexed
+
+        This also builds the children of ComponentDefinitions read lazily. Only the top level
+        objects changed since the last refresh are looked at.
+        """
+        self._identities.refresh()
 
     def get_components(self, uri):
         """
@@ -238,10 +677,15 @@ class Document(object):
             component_definition = self._components[uri]
         except KeyError:
             return False
+        return component_definition.ordered_components()
 
-        sorted_sequences = sorted(component_definition.sequence_annotations,
-                                  key=attrgetter('first_location'))
-        return [c.component for c in sorted_sequences]
+    def get_components_many(self, uris):
+        """
+        Get components in order for each of several component definitions
+
+        Returns a dict from each uri to its components, or False when it is not in the document.
+        """
+        return {uri: self.get_components(uri) for uri in uris}
 
     def clear_document(self):
         """
@@ -256,6 +700,10 @@ class Document(object):
         self._annotations.clear()
         self._functional_component_store.clear()
         self._collection_store.clear()
+        self._uris.clear()
+        self._identities.clear()
+        self._kmers.clear()
+        self._contents.clear()
 
     def _get_elements(self, graph, element_type):
         return graph.triples((None, RDF.type, element_type))
@@ -265,7 +713,7 @@ class Document(object):
         Get a value from an RDF triple
         """
         value = graph.value(subject=identity, predicate=rdf_type)
-        return value.toPython() if value is not None else value
+        return self._read_value(value) if value is not None else value
 
     def _get_triplet_value_list(self, graph, identity, rdf_type):
         """
@@ -273,304 +721,730 @@ class Document(object):
         """
         values = []
         for elem in graph.objects(identity, rdf_type):
-            values.append(elem.toPython())
+            values.append(self._read_value(elem))
         return values
 
+    def _get_property_value(self, properties, rdf_type):
+        """
+        Get a value from the predicate -> objects mapping of a subject
+        """
+        for value in properties.get(rdf_type, ()):
+            return self._read_value(value)
+        return None
+
+    def _read_value(self, value):
+        """
+        Python value of an RDF term, URIs are interned in the document URI table
+        """
+        if isinstance(value, URIRef):
+            return self._uris.intern(value)
+        return value.toPython()
+
     def _get_rdf_identified(self, graph, identity):
+        properties = graph.properties(identity)
         c = {}
-        c['identity'] = identity.toPython() if type(identity) is not str else identity
-        c['display_id'] = self._get_triplet_value(graph, identity, SBOL.displayId)
-        c['was_derived_from'] = self._get_triplet_value(graph, identity, PROV.wasDerivedFrom)
-        c['version'] = self._get_triplet_value(graph, identity, SBOL.version)
-        c['description'] = self._get_triplet_value(graph, identity, DCTERMS.description)
-        c['name'] = self._get_triplet_value(graph, identity, DCTERMS.title)
-
-        flipped_namespaces = {v: k for k, v in self._namespaces.items()}
+        c['identity'] = self._uris.intern(identity)
+        c['display_id'] = self._get_property_value(properties, SBOL.displayId)
+        c['was_derived_from'] = self._get_property_value(properties, PROV.wasDerivedFrom)
+        c['version'] = self._get_property_value(properties, SBOL.version)
+        c['description'] = self._get_property_value(properties, DCTERMS.description)
+        c['name'] = self._get_property_value(properties, DCTERMS.title)
+
         # Get annotations (non top level)
         c['annotations'] = []
-        for triple in graph.triples((identity, None, None)):
-            namespace, obj = split_uri(triple[1])
-            prefix = flipped_namespaces[namespace]
-            as_string = '{}:{}'.format(prefix, obj)
-            if as_string not in VALID_ENTITIES:
+        for predicate, objects in properties.items():
+            namespace, obj, prefix, is_core_sbol = self._namespace_resolver.resolve(predicate)
+            if not is_core_sbol:
                 q_name = QName(namespace=namespace, local_name=obj, prefix=prefix)
-                if isinstance(triple[2], URIRef):
-                    value = AnnotationValue(uri=triple[2].toPython())
-                elif isinstance(triple[2], Literal):
-                    value = AnnotationValue(literal=triple[2].toPython())
-                else:
-                    value = None
-                c['annotations'].append(Annotation(q_name=q_name, annotation_value=value))
+                for item in objects:
+                    if isinstance(item, URIRef):
+                        value = AnnotationValue(uri=self._uris.intern(item))
+                    elif isinstance(item, Literal):
+                        value = AnnotationValue(literal=item.toPython())
+                    else:
+                        value = None
+                    c['annotations'].append(Annotation(q_name=q_name, annotation_value=value))
         return c
 
+    def _accept_read_object(self, store, graph, identity):
+        """
+        Check whether an object about to be read should be built when appending to the document
+        """
+        if self._on_conflict is None or identity.toPython() not in store:
+            return True
+        return _keep_incoming(self._on_conflict, identity, store[identity.toPython()].version,
+                              self._get_triplet_value(graph, identity, SBOL.version))
+
+    def _add_read_object(self, obj, *stores):
+        """
+        Store an object created while reading, resolving any references waiting on it
+        """
+        for store in stores:
+            store[obj.identity] = obj
+        if self._forward_references is not None:
+            self._forward_references.resolve(obj.identity)
+
+    def _resolve_reference(self, store, uri, assign, optional=False):
+        """
+        Pass the object stored for uri to assign, deferring it if the object is still to be read
+
+        A KeyError is raised if the object is never read unless optional is set.
+        """
+        if uri in store:
+            assign(store[uri])
+        elif self._forward_references is not None:
+            self._forward_references.add(store, uri, assign, optional)
+        elif not optional:
+            raise KeyError(uri)
+
     def _read_sequences(self, graph):
         """
         Read graph and add sequences to document
         """
         for e in self._get_elements(graph, SBOL.Sequence):
-            identity = e[0]
-            c = self._get_rdf_identified(graph, identity)
-            c['elements'] = self._get_triplet_value(graph, identity, SBOL.elements)
-            c['encoding'] = self._get_triplet_value(graph, identity, SBOL.encoding)
-            seq = Sequence(**c)
-            self._sequences[identity.toPython()] = seq
-            self._collection_store[identity.toPython()] = seq
+            self._read_sequence(graph, e[0])
+
+    def _read_sequence(self, graph, identity):
+        if not self._accept_read_object(self._sequences, graph, identity):
+            return None
+        c = self._get_rdf_identified(graph, identity)
+        c['elements'] = self._get_triplet_value(graph, identity, SBOL.elements)
+        c['encoding'] = self._get_triplet_value(graph, identity, SBOL.encoding)
+        seq = Sequence(**c)
+        self._store_sequence(seq)
+        self._add_read_object(seq, self._sequences, self._collection_store)
+        return seq
 
     def _read_component_definitions(self, graph):
         """
         Read graph and add component defintions to document
         """
+        definitions = []
         for e in self._get_elements(graph, SBOL.ComponentDefinition):
-            identity = e[0]
-            # Store component values in dict
-            c = self._get_rdf_identified(graph, identity)
-            c['roles'] = self._get_triplet_value_list(graph, identity, SBOL.role)
-            c['types'] = self._get_triplet_value_list(graph, identity, SBOL.type)
-            obj = ComponentDefinition(**c)
-            self._components[identity.toPython()] = obj
-            self._collection_store[identity.toPython()] = obj
+            definition = self._read_component_definition(graph, e[0])
+            if definition is not None:
+                definitions.append(definition)
+        return definitions
 
-    def _extend_component_definitions(self, graph):
+    def _read_component_definition(self, graph, identity):
+        if not self._accept_read_object(self._components, graph, identity):
+            return None
+        # Store component values in dict
+        c = self._get_rdf_identified(graph, identity)
+        c['roles'] = self._get_triplet_value_list(graph, identity, SBOL.role)
+        c['types'] = self._get_triplet_value_list(graph, identity, SBOL.type)
+        obj = ComponentDefinition(**c)
+        # Sequences not in the file, or the document when appending, are left out
+        for sequence in self._get_triplet_value_list(graph, identity, SBOL.sequence):
+            self._resolve_reference(self._sequences, sequence, obj.sequences.append,
+                                    optional=True)
+        self._add_read_object(obj, self._components, self._collection_store)
+        return obj
+
+    def _extend_component_definitions(self, graph, definitions):
         """
         Read graph and update component definitions with related elements
         """
-        for def_uri, comp_def in self._components.items():
-            # Store created components indexed for later lookup
-            component_index = {}
-            identity = URIRef(def_uri)
+        for comp_def in definitions:
+            identity = URIRef(comp_def.identity)
+            if self._lazy_read:
+                # The loader only keeps the triples it needs, not the whole graph
+                comp_def._defer_children(partial(self._extend_component_definition,
+                                                 self._child_subjects(graph, identity),
+                                                 identity, comp_def))
+            else:
+                self._extend_component_definition(graph, identity, comp_def)
 
-            # Get components
-            for comp in graph.triples((identity, SBOL.component, None)):
-                comp_identity = comp[2]
-                ci = self._get_rdf_identified(graph, comp_identity)
-                ci['maps_to'] = self._get_triplet_value(graph, comp_identity, SBOL.mapTo)
-                ci['access'] = self._get_triplet_value(graph, comp_identity, SBOL.access)
+    def _child_subjects(self, graph, identity):
+        """
+        SubjectIndex of only the triples _extend_component_definition reads for identity
+        """
+        index = SubjectIndex()
+        pending = []
+        for predicate in CHILD_PREDICATES:
+            for obj in graph.objects(identity, predicate):
+                index.add((identity, predicate, obj))
+                pending.append(obj)
+        while pending:
+            subject = pending.pop()
+            for predicate, objects in graph.properties(subject).items():
+                for obj in objects:
+                    index.add((subject, predicate, obj))
+                    if predicate == SBOL.location:
+                        pending.append(obj)
+        return index
 
-                component_comp_def = self._get_triplet_value(graph, comp_identity, SBOL.definition)
-                ci['definition'] = self._components[component_comp_def]
+    def _extend_component_definition(self, graph, identity, comp_def):
+        # Store created components indexed for later lookup
+        component_index = {}
 
-                c = Component(**ci)
-                component_index[ci['identity']] = c
-            self._components[def_uri].components = list(component_index.values())
+        # Get components
+        for comp in graph.triples((identity, SBOL.component, None)):
+            comp_identity = comp[2]
+            ci = self._get_rdf_identified(graph, comp_identity)
+            ci['maps_to'] = self._get_triplet_value(graph, comp_identity, SBOL.mapTo)
+            ci['access'] = self._get_triplet_value(graph, comp_identity, SBOL.access)
+            ci['definition'] = None
 
-            # Get sequence annotations
-            if (identity, SBOL.sequenceAnnotation, None) in graph:
-                find_annotation_using = (identity, SBOL.sequenceAnnotation, None)
-            else:
-                find_annotation_using = (identity, SBOL.SequenceAnnotation, None)
-            sequence_annotations = []
-            for seq_annot in graph.triples(find_annotation_using):
-                seq_identity = seq_annot[2]
-                sa = self._get_rdf_identified(graph, seq_identity)
-                component_to_use = self._get_triplet_value(graph, seq_identity, SBOL.component)
-                sa['component'] = component_index[component_to_use]
-                sa['roles'] = self._get_triplet_value_list(graph, seq_identity, SBOL.role)
-                locations = []
-                for loc in graph.triples((seq_identity, SBOL.location, None)):
-                    loc_identity = loc[2]
-                    location = self._get_rdf_identified(graph, loc_identity)
-                    location['orientation'] = self._get_triplet_value(graph, loc_identity,
-                                                                      SBOL.orientation)
-                    location_type = URIRef(self._get_triplet_value(graph, loc_identity, RDF.type))
-                    if location_type == SBOL.Range:
-                        location['start'] = self._get_triplet_value(graph, loc_identity, SBOL.start)
-                        location['end'] = self._get_triplet_value(graph, loc_identity, SBOL.end)
-                        locations.append(Range(**location))
-                    elif location_type == SBOL.Cut:
-                        location['at'] = self._get_triplet_value(graph, loc_identity, SBOL.at)
-                        locations.append(Cut(**location))
-                    else:
-                        locations.append(GenericLocation(**location))
-                sa_obj = SequenceAnnotation(locations=locations, **sa)
-                sequence_annotations.append(sa_obj)
-            self._components[def_uri].sequence_annotations = sequence_annotations
-
-            # Get sequence constraints
-            if (identity, SBOL.sequenceConstraint, None) in graph:
-                find_constraint_using = (identity, SBOL.sequenceConstraint, None)
-            else:
-                find_constraint_using = (identity, SBOL.SequenceConstraint, None)
-            sequence_constraints = []
-            for seq_constraint in graph.triples(find_constraint_using):
-                seq_identity = seq_constraint[2]
-                sc = self._get_rdf_identified(graph, seq_identity)
-                sc['restriction'] = self._get_triplet_value(graph, seq_identity, SBOL.restriction)
-                subject_id = self._get_triplet_value(graph, seq_identity, SBOL.subject)
-                sc['subject'] = component_index[subject_id]
-                object_id = self._get_triplet_value(graph, seq_identity, SBOL.object)
-                # Object is a reserved word so call it obj to prevent clashes
-                sc['obj'] = component_index[object_id]
-                sc_obj = SequenceConstraint(**sc)
-                sequence_constraints.append(sc_obj)
-            self._components[def_uri].sequence_constraints = sequence_constraints
+            c = Component(**ci)
+            component_comp_def = self._get_triplet_value(graph, comp_identity, SBOL.definition)
+            self._resolve_reference(self._components, component_comp_def,
+                                    partial(setattr, c, 'definition'))
+            component_index[ci['identity']] = c
+        comp_def.components = list(component_index.values())
+
+        # Get sequence annotations
+        if (identity, SBOL.sequenceAnnotation, None) in graph:
+            find_annotation_using = (identity, SBOL.sequenceAnnotation, None)
+        else:
+            find_annotation_using = (identity, SBOL.SequenceAnnotation, None)
+        sequence_annotations = []
+        for seq_annot in graph.triples(find_annotation_using):
+            seq_identity = seq_annot[2]
+            sa = self._get_rdf_identified(graph, seq_identity)
+            component_to_use = self._get_triplet_value(graph, seq_identity, SBOL.component)
+            sa['component'] = component_index[component_to_use]
+            sa['roles'] = self._get_triplet_value_list(graph, seq_identity, SBOL.role)
+            locations = []
+            for loc in graph.triples((seq_identity, SBOL.location, None)):
+                loc_identity = loc[2]
+                location = self._get_rdf_identified(graph, loc_identity)
+                location['orientation'] = self._get_triplet_value(graph, loc_identity,
+                                                                  SBOL.orientation)
+                location_type = URIRef(self._get_triplet_value(graph, loc_identity, RDF.type))
+                if location_type == SBOL.Range:
+                    location['start'] = self._get_triplet_value(graph, loc_identity, SBOL.start)
+                    location['end'] = self._get_triplet_value(graph, loc_identity, SBOL.end)
+                    locations.append(Range(**location))
+                elif location_type == SBOL.Cut:
+                    location['at'] = self._get_triplet_value(graph, loc_identity, SBOL.at)
+                    locations.append(Cut(**location))
+                else:
+                    locations.append(GenericLocation(**location))
+            sa_obj = SequenceAnnotation(locations=locations, **sa)
+            sequence_annotations.append(sa_obj)
+        comp_def.sequence_annotations = sequence_annotations
+
+        # Get sequence constraints
+        if (identity, SBOL.sequenceConstraint, None) in graph:
+            find_constraint_using = (identity, SBOL.sequenceConstraint, None)
+        else:
+            find_constraint_using = (identity, SBOL.SequenceConstraint, None)
+        sequence_constraints = []
+        for seq_constraint in graph.triples(find_constraint_using):
+            seq_identity = seq_constraint[2]
+            sc = self._get_rdf_identified(graph, seq_identity)
+            sc['restriction'] = self._get_triplet_value(graph, seq_identity, SBOL.restriction)
+            subject_id = self._get_triplet_value(graph, seq_identity, SBOL.subject)
+            sc['subject'] = component_index[subject_id]
+            object_id = self._get_triplet_value(graph, seq_identity, SBOL.object)
+            # Object is a reserved word so call it obj to prevent clashes
+            sc['obj'] = component_index[object_id]
+            sc_obj = SequenceConstraint(**sc)
+            sequence_constraints.append(sc_obj)
+        comp_def.sequence_constraints = sequence_constraints
 
     def _read_models(self, graph):
         """
         Read graph and add models to document
         """
         for e in self._get_elements(graph, SBOL.Model):
-            identity = e[0]
-            m = self._get_rdf_identified(graph, identity)
-            m['source'] = self._get_triplet_value(graph, identity, SBOL.source)
-            m['language'] = self._get_triplet_value(graph, identity, SBOL.language)
-            m['framework'] = self._get_triplet_value(graph, identity, SBOL.framework)
-            obj = Model(**m)
-            self._models[identity.toPython()] = obj
-            self._collection_store[identity.toPython()] = obj
+            self._read_model(graph, e[0])
+
+    def _read_model(self, graph, identity):
+        if not self._accept_read_object(self._models, graph, identity):
+            return None
+        m = self._get_rdf_identified(graph, identity)
+        m['source'] = self._get_triplet_value(graph, identity, SBOL.source)
+        m['language'] = self._get_triplet_value(graph, identity, SBOL.language)
+        m['framework'] = self._get_triplet_value(graph, identity, SBOL.framework)
+        obj = Model(**m)
+        self._add_read_object(obj, self._models, self._collection_store)
+        return obj
 
     def _read_module_definitions(self, graph):
         """
         Read graph and add module defintions to document
         """
+        module_definitions = []
         for e in self._get_elements(graph, SBOL.ModuleDefinition):
-            identity = e[0]
-            m = self._get_rdf_identified(graph, identity)
-            m['roles'] = self._get_triplet_value_list(graph, identity, SBOL.role)
-            functional_components = {}
-            for func_comp in graph.triples((identity, SBOL.functionalComponent, None)):
-                func_identity = func_comp[2]
-                fc = self._get_rdf_identified(graph, func_identity)
-                definition = self._get_triplet_value(graph, func_identity, SBOL.definition)
-                fc['definition'] = self._components[definition]
-                fc['access'] = self._get_triplet_value(graph, func_identity, SBOL.access)
-                fc['direction'] = self._get_triplet_value(graph, func_identity, SBOL.direction)
-                functional_components[func_identity.toPython()] = FunctionalComponent(**fc)
-                self._functional_component_store[func_identity.toPython()] = \
-                        functional_components[func_identity.toPython()]
-            interactions = []
-            for inter in graph.triples((identity, SBOL.interaction, None)):
-                inter_identity = inter[2]
-                it = self._get_rdf_identified(graph, inter_identity)
-                it['types'] = self._get_triplet_value_list(graph, inter_identity, SBOL.types)
-                participations = []
-                for p in graph.triples((inter_identity, SBOL.participation, None)):
-                    pc = self._get_rdf_identified(graph, p[2])
-                    roles = self._get_triplet_value_list(graph, p[2], SBOL.role)
-                    # Need to use one of the functional component created above
-                    participant_id = self._get_triplet_value(graph, p[2], SBOL.participant)
-                    participant = functional_components[participant_id]
-                    participations.append(Participation(roles=roles, participant=participant, **pc))
-                interactions.append(Interaction(participations=participations, **it))
-            obj = ModuleDefinition(functional_components=functional_components.values(),
-                                   interactions=interactions,
-                                   **m)
-            self._modules[identity.toPython()] = obj
-            self._collection_store[identity.toPython()] = obj
-
-    def _extend_module_definitions(self, graph):
+            module_definition = self._read_module_definition(graph, e[0])
+            if module_definition is not None:
+                module_definitions.append(module_definition)
+        return module_definitions
+
+    def _read_module_definition(self, graph, identity):
+        if not self._accept_read_object(self._modules, graph, identity):
+            return None
+        m = self._get_rdf_identified(graph, identity)
+        m['roles'] = self._get_triplet_value_list(graph, identity, SBOL.role)
+        functional_components = {}
+        for func_comp in graph.triples((identity, SBOL.functionalComponent, None)):
+            func_identity = func_comp[2]
+            fc = self._get_rdf_identified(graph, func_identity)
+            fc['definition'] = None
+            fc['access'] = self._get_triplet_value(graph, func_identity, SBOL.access)
+            fc['direction'] = self._get_triplet_value(graph, func_identity, SBOL.direction)
+            fc_obj = FunctionalComponent(**fc)
+            definition = self._get_triplet_value(graph, func_identity, SBOL.definition)
+            self._resolve_reference(self._components, definition,
+                                    partial(setattr, fc_obj, 'definition'))
+            functional_components[func_identity.toPython()] = fc_obj
+            self._add_read_object(fc_obj, self._functional_component_store)
+        interactions = []
+        for inter in graph.triples((identity, SBOL.interaction, None)):
+            inter_identity = inter[2]
+            it = self._get_rdf_identified(graph, inter_identity)
+            it['types'] = self._get_triplet_value_list(graph, inter_identity, SBOL.types)
+            participations = []
+            for p in graph.triples((inter_identity, SBOL.participation, None)):
+                pc = self._get_rdf_identified(graph, p[2])
+                roles = self._get_triplet_value_list(graph, p[2], SBOL.role)
+                # Need to use one of the functional component created above
+                participant_id = self._get_triplet_value(graph, p[2], SBOL.participant)
+                participant = functional_components[participant_id]
+                participations.append(Participation(roles=roles, participant=participant, **pc))
+            interactions.append(Interaction(participations=participations, **it))
+        obj = ModuleDefinition(functional_components=list(functional_components.values()),
+                               interactions=interactions,
+                               **m)
+        self._add_read_object(obj, self._modules, self._collection_store)
+        return obj
+
+    def _extend_module_definitions(self, graph, module_definitions):
         """
         Using collected module definitions extend linkages
         """
-        for mod_id in self._modules:
-            mod_identity = self._get_triplet_value(graph, URIRef(mod_id), SBOL.module)
-            modules = []
-            for mod in graph.triples((mod_identity, SBOL.module, None)):
-                md = self._get_rdf_identified(graph, mod[2])
-                definition_id = self._get_triplet_value(graph, mod[2], SBOL.definition)
-                md['definition'] = self._modules[definition_id]
-                maps_to = []
-                for m in graph.triples((mod[2], SBOL.mapsTo, None)):
-                    mt = self._get_rdf_identified(graph, m[2])
-                    mt['refinement'] = self._get_triplet_value(graph, m[2], SBOL.refinement)
-                    local_id = self._get_triplet_value(graph, m[2], SBOL.local)
-                    remote_id = self._get_triplet_value(graph, m[2], SBOL.remote)
-                    mt['local'] = self._functional_component_store[local_id]
-                    mt['remote'] = self._functional_component_store[remote_id]
-                    maps_to.append(MapsTo(**mt))
-                modules.append(Module(maps_to=maps_to, **md))
-            self._modules[mod_id].modules = modules
+        for module_definition in module_definitions:
+            self._extend_module_definition(graph, URIRef(module_definition.identity),
+                                           module_definition)
+
+    def _extend_module_definition(self, graph, identity, module_definition):
+        modules = []
+        for mod in graph.triples((identity, SBOL.module, None)):
+            md = self._get_rdf_identified(graph, mod[2])
+            md['definition'] = None
+            maps_to = []
+            for m in graph.triples((mod[2], SBOL.mapsTo, None)):
+                mt = self._get_rdf_identified(graph, m[2])
+                mt['refinement'] = self._get_triplet_value(graph, m[2], SBOL.refinement)
+                mt['local'] = None
+                mt['remote'] = None
+                map_to = MapsTo(**mt)
+                local_id = self._get_triplet_value(graph, m[2], SBOL.local)
+                remote_id = self._get_triplet_value(graph, m[2], SBOL.remote)
+                self._resolve_reference(self._functional_component_store, local_id,
+                                        partial(setattr, map_to, 'local'))
+                self._resolve_reference(self._functional_component_store, remote_id,
+                                        partial(setattr, map_to, 'remote'))
+                maps_to.append(map_to)
+            module = Module(maps_to=maps_to, **md)
+            definition_id = self._get_triplet_value(graph, mod[2], SBOL.definition)
+            self._resolve_reference(self._modules, definition_id,
+                                    partial(setattr, module, 'definition'))
+            modules.append(module)
+        module_definition.modules = modules
 
     def _read_annotations(self, graph):
         """
         Find any non-defined elements at TopLevel and create annotations
         """
-        flipped_namespaces = {v: k for k, v in self._namespaces.items()}
         for triple in graph.triples((None, RDF.type, None)):
-            namespace, obj = split_uri(triple[2])
-            prefix = flipped_namespaces[namespace]
-            as_string = '{}:{}'.format(prefix, obj)
-            if as_string not in VALID_ENTITIES:
+            namespace, obj, prefix, is_core_sbol = self._namespace_resolver.resolve(triple[2])
+            if not is_core_sbol:
                 identity = triple[0]
+                if not self._accept_read_object(self._annotations, graph, identity):
+                    continue
                 gt = self._get_rdf_identified(graph, identity)
                 q_name = QName(namespace=namespace, local_name=obj, prefix=prefix)
                 gt['rdf_type'] = q_name
                 gt_obj = GenericTopLevel(**gt)
-                self._annotations[identity.toPython()] = gt_obj
-                self._collection_store[identity.toPython()] = gt_obj
+                self._add_read_object(gt_obj, self._annotations, self._collection_store)
 
     def _read_collections(self, graph):
         """
         Read graph and add collections to document
         """
         for e in self._get_elements(graph, SBOL.Collection):
-            identity = e[0]
-            c = self._get_rdf_identified(graph, identity)
-            members = []
-            # Need to handle other non-standard TopLevel objects first
-            for m in graph.triples((identity, SBOL.member, None)):
-                members.append(self._collection_store[m[2].toPython()])
-            obj = Collection(members=members, **c)
-            self._collections[identity.toPython()] = obj
+            self._read_collection(graph, e[0])
+
+    def _read_collection(self, graph, identity):
+        if not self._accept_read_object(self._collections, graph, identity):
+            return None
+        c = self._get_rdf_identified(graph, identity)
+        obj = Collection(members=[], **c)
+        members = obj.members
+        # Need to handle other non-standard TopLevel objects first
+        for m in graph.triples((identity, SBOL.member, None)):
+            members.append(None)
+            self._resolve_reference(self._collection_store, self._uris.intern(m[2]),
+                                    partial(members.__setitem__, len(members) - 1))
+        self._add_read_object(obj, self._collections)
+        return obj
 
-    def read(self, f):
+    def _add_read_namespace(self, prefix, namespace):
+        """
+        Record a namespace found while reading a file
+        """
+        if not namespace.endswith(('#', '/', ':')):
+            namespace = namespace + '/'
+        self._namespaces[prefix] = namespace
+        self._namespace_resolver.add(prefix, namespace)
+        # Extend the existing namespaces available
+        XML_NS[prefix] = namespace
+
+    def read(self, f, engine='rdflib', lazy=False, cache_dir=None, max_pending_references=100000):
         """
         Read in an SBOL file, replacing current document contents
+
+        The default engine parses the file into an rdflib Graph first, the stream engine walks
+        the RDF/XML once and keeps at most max_pending_references unresolved forward references.
+        With lazy set the components, sequence annotations and sequence constraints of each
+        ComponentDefinition are only built from the parsed data when first used, so errors in
+        them are raised at that point.
+
+        If cache_dir is given a snapshot of the document read from each file is kept there, keyed
+        by the file name and content, and loaded instead of parsing the file when it is unchanged.
+        Snapshots are unpickled, so cache_dir must only be writable by trusted users.
+
+        Sequences at least as long as the threshold of the document's sequence_store are moved
+        to it as they are read. With the stream engine only one sequence is in memory at a time.
         """
         self.clear_document()
+        if cache_dir is None:
+            self._read(f, engine, lazy, max_pending_references)
+        else:
+            path = snapshot_path(cache_dir, snapshot_key(f))
+            state = load_snapshot(path)
+            if state is not None:
+                self._restore_snapshot(state)
+            else:
+                self._read(f, engine, lazy, max_pending_references)
+                save_snapshot(path, self._snapshot_state())
+        self._index_top_levels(self._top_level_values())
+
+    def _top_level_values(self, document=None):
+        """
+        Objects in the top level stores of a document, this one by default
+        """
+        if document is None:
+            document = self
+        for store in INDEX_STORES:
+            yield from getattr(document, store).values()
+
+    def _index_top_levels(self, top_levels):
+        for obj in top_levels:
+            self._identities.add(obj)
+
+    def _snapshot_state(self):
+        """
+        Everything read from a file, with all lazily read children built
+        """
+        for definition in self._components.values():
+            definition._load_children()
+        state = {store: getattr(self, store) for store in READ_STORES}
+        state['_namespaces'] = self._namespaces
+        return state
+
+    def _restore_snapshot(self, state):
+        for store in READ_STORES:
+            getattr(self, store).update(state[store])
+        # Snapshots keep sequences as they were read, which may not match this document
+        for sequence in self._sequences.values():
+            self._store_sequence(sequence)
+        for prefix, namespace in state['_namespaces'].items():
+            self._add_read_namespace(prefix, namespace)
+
+    def _read(self, f, engine, lazy, max_pending_references):
+        # Shared by every read phase so each predicate and type URI is only split once
+        self._namespace_resolver = NamespaceResolver()
+        self._lazy_read = lazy
+        try:
+            self._read_engine(f, engine, max_pending_references)
+        finally:
+            self._lazy_read = False
+
+    def _read_engine(self, f, engine, max_pending_references):
+        if engine == 'stream':
+            self._forward_references = ForwardReferences(max_pending_references)
+            try:
+                StreamReader(self).read(f)
+                self._forward_references.check()
+            finally:
+                self._forward_references = None
+            return
+        elif engine != 'rdflib':
+            raise ValueError('Unknown read engine "{}"'.format(engine))
 
         g = Graph()
         g.parse(f, format='xml')
 
         for n in g.namespaces():
-            ns = n[1].toPython()
-            if not ns.endswith(('#', '/', ':')):
-                ns = ns + '/'
-            self._namespaces[n[0]] = ns
-            # Extend the existing namespaces available
-            XML_NS[n[0]] = ns
-
-        self._read_sequences(g)
-        self._read_component_definitions(g)
-        self._extend_component_definitions(g)
-        self._read_models(g)
-        self._read_module_definitions(g)
-        self._extend_module_definitions(g)
-        self._read_annotations(g)
+            self._add_read_namespace(n[0], n[1].toPython())
+
+        # Index every subject once so the read phases only do dictionary lookups
+        index = SubjectIndex.from_graph(g)
+        del g
+
+        self._read_sequences(index)
+        definitions = self._read_component_definitions(index)
+        self._extend_component_definitions(index, definitions)
+        self._read_models(index)
+        module_definitions = self._read_module_definitions(index)
+        self._extend_module_definitions(index, module_definitions)
+        self._read_annotations(index)
         # Last as this needs all other top level objects created
-        self._read_collections(g)
+        self._read_collections(index)
 
-    def append(self, f):
+    def read_many(self, paths, workers=None, engine='rdflib', on_conflict='error'):
         """
-        Read an SBOL file and append contents to current document
+        Read several SBOL files in parallel, replacing current document contents with all of them
+
+        Each file must be self contained. An identity defined in more than one file is handled
+        by on_conflict, see append.
+        """
+        _check_conflict_policy(on_conflict)
+        self.clear_document()
+        for path, document in self._read_files(paths, workers, engine, in_order=True):
+            self._merge_document(document, on_conflict)
+
+    def iter_read_many(self, paths, workers=None, engine='rdflib'):
+        """
+        Read several SBOL files in parallel, yielding (path, Document) as each file finishes
         """
-        pass
+        return self._read_files(paths, workers, engine, in_order=False)
 
-    def _add_to_root(self, root_node, elements):
-        for item in elements:
-            elem = item._as_rdf_xml(self.ns)
-            root_node.append(elem)
+    def _read_files(self, paths, workers, engine, in_order):
+        read_file = partial(_read_document_file, self.document_namespace, engine, self.validate,
+                            self.pack_sequences)
+        if workers == 1:
+            results = ((path, read_file(path)) for path in paths)
+        else:
+            results = self._read_files_in_pool(paths, workers, read_file, in_order)
+        for path, document in results:
+            # Worker processes extend their own copy of XML_NS
+            for prefix, namespace in document._namespaces.items():
+                XML_NS[prefix] = namespace
+            yield path, document
 
-    def write(self, f):
+    def _read_files_in_pool(self, paths, workers, read_file, in_order):
+        paths = list(paths)
+        with ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+            if in_order:
+                yield from zip(paths, executor.map(read_file, paths))
+            else:
+                futures = {executor.submit(read_file, path): path for path in paths}
+                for future in as_completed(futures):
+                    yield futures[future], future.result()
+
+    def _merge_document(self, other, on_conflict='error'):
+        """
+        Move the contents of another document into this one
+        """
+        dropped = set()
+        for store in TOP_LEVEL_STORES:
+            existing = getattr(self, store)
+            for identity, obj in getattr(other, store).items():
+                if identity in existing and not _keep_incoming(on_conflict, identity,
+                                                               existing[identity].version,
+                                                               obj.version):
+                    dropped.add(identity)
+        for store in READ_STORES:
+            getattr(self, store).update((identity, obj)
+                                        for identity, obj in getattr(other, store).items()
+                                        if identity not in dropped)
+        for identity, sequence in other._sequences.items():
+            if identity not in dropped:
+                self._store_sequence(sequence, other._contents.digest(sequence.elements))
+        self._index_top_levels(obj for obj in self._top_level_values(other)
+                               if obj.identity not in dropped)
+        for prefix, namespace in other._namespaces.items():
+            self._add_read_namespace(prefix, namespace)
+
+    def append(self, f, engine='rdflib', on_conflict='error', lazy=False,
+               max_pending_references=100000):
+        """
+        Read an SBOL file and append contents to current document
+
+        References to objects already in the document are resolved to them. When the file
+        defines an identity that is already present on_conflict decides what happens: 'error'
+        raises a ValueError and leaves the document unchanged, 'skip' keeps the existing object,
+        'replace' uses the new one and 'newest' keeps whichever has the higher version. Objects
+        already in the document that referred to a replaced object keep referring to it. lazy is
+        as for read.
+        """
+        _check_conflict_policy(on_conflict)
+
+        # Read into a layer over the current stores so lookups see both, then merge the layer
+        staging = Document(self.document_namespace, validate=self.validate,
+                           pack_sequences=self.pack_sequences,
+                           sequence_store=self.sequence_store)
+        for store in READ_STORES:
+            setattr(staging, store, ChainMap({}, getattr(self, store)))
+        staging._on_conflict = on_conflict
+        staging._uris = self._uris
+        staging._read(f, engine, lazy, max_pending_references)
+
+        for store in READ_STORES:
+            getattr(self, store).update(getattr(staging, store).maps[0])
+        # Appended sequences share elements with those already in the document
+        for sequence in staging._sequences.maps[0].values():
+            self._store_sequence(sequence, staging._contents.digest(sequence.elements))
+        self._index_top_levels(obj for store in INDEX_STORES
+                               for obj in getattr(staging, store).maps[0].values())
+        for prefix, namespace in staging._namespaces.items():
+            self._add_read_namespace(prefix, namespace)
+
+    def _top_level_objects(self):
+        """
+        TopLevel objects in the order they are written
+        """
+        # TODO: TopLevel Annotations
+        for store in WRITE_STORES:
+            yield from sorted(getattr(self, store).values(), key=lambda x: x.identity)
+
+    def write(self, f, cache=False, workers=1, extra=()):
         """
         Write an SBOL file from current document contents
+
+        Each TopLevel object is serialised and written on its own, so memory use is bounded by
+        the largest object rather than the whole document. The output is the same as
+        serialising the whole document in one go.
+
+        With cache set the serialised form of each TopLevel object is kept on it and reused by
+        later writes until the object, an object it holds or the identity of an object it refers
+        to is changed. Lists assigned to attributes are copied, so changes must be made through
+        the attribute rather than the list that was assigned.
+
+        With workers other than 1 objects are serialised in chunks by a pool of that many
+        processes (all CPUs if None), each chunk is pickled along with the objects it refers to.
+        The output is the same as writing in this process.
+
+        Objects in extra, which may be a generator, are written after those of the document.
         """
         rdf = ET.Element(NS('rdf', 'RDF'), nsmap=XML_NS)
+        key = (str(self.ns), tuple(XML_NS.items())) if cache else None
+        if cache:
+            # Drops the cached form of objects referring to an object that was renamed
+            self._refresh_identities()
+        if workers == 1:
+            serialised = ((obj, self._serialise(rdf, obj, key))
+                          for obj in self._top_level_objects())
+        else:
+            serialised = self._serialise_in_pool(rdf, key, workers)
+        serialised = chain(serialised, ((obj, self._serialise(rdf, obj)) for obj in extra))
+        tail = None
+        for obj, output in serialised:
+            if tail is None:
+                head, tail = self._serialised_root(rdf)
+                f.write(head)
+            self._write_serialised(f, output, obj)
 
-        # TODO: TopLevel Annotations
-        sequence_values = sorted(self._sequences.values(), key=lambda x: x.identity)
-        self._add_to_root(rdf, sequence_values)
-        component_values = sorted(self._components.values(), key=lambda x: x.identity)
-        self._add_to_root(rdf, component_values)
-        model_values = sorted(self._models.values(), key=lambda x: x.identity)
-        self._add_to_root(rdf, model_values)
-        module_values = sorted(self._modules.values(), key=lambda x: x.identity)
-        self._add_to_root(rdf, module_values)
-        collection_values = sorted(self._collections.values(), key=lambda x: x.identity)
-        self._add_to_root(rdf, collection_values)
-        annotation_values = sorted(self._annotations.values(), key=lambda x: x.identity)
-        self._add_to_root(rdf, annotation_values)
-
-        f.write(ET.tostring(rdf,
-                            pretty_print=True,
-                            xml_declaration=True,
-                            encoding='utf-8'))
+        if tail is None:
+            f.write(ET.tostring(rdf,
+                                pretty_print=True,
+                                xml_declaration=True,
+                                encoding='utf-8'))
+        else:
+            f.write(tail)
+
+    def _serialised_root(self, rdf):
+        """
+        Declaration and opening tag, and closing tag, of the serialised root element
+        """
+        child = ET.SubElement(rdf, NS('rdf', 'Description'))
+        output = ET.tostring(rdf,
+                             pretty_print=True,
+                             xml_declaration=True,
+                             encoding='utf-8')
+        rdf.remove(child)
+        end = output.rindex(b'</')
+        return output[:output.rindex(b'\n', 0, end - 1) + 1], output[end:]
+
+    def _cached_serialised(self, obj, key):
+        if key is not None and obj._serialised is not None and obj._serialised[0] == key:
+            return obj._serialised[1]
+        return None
+
+    def _serialise(self, rdf, obj, key=None):
+        """
+        Serialised form of a TopLevel object as it is written under the root element
+
+        If key is given the result is cached on the object with it.
+        """
+        cached = self._cached_serialised(obj, key)
+        if cached is not None:
+            return cached
+        elem = obj._as_rdf_xml(self.ns)
+        rdf.append(elem)
+        output = ET.tostring(rdf, pretty_print=True, encoding='utf-8')
+        rdf.remove(elem)
+        # Alone under the root the object is everything between the root tags
+        serialised = output[output.index(b'>\n') + 2:output.rindex(b'</')]
+        if key is not None:
+            obj._serialised = (key, serialised)
+        return serialised
+
+    def _serialise_in_pool(self, rdf, key, workers):
+        """
+        Serialise TopLevel objects in worker processes, yielding (object, bytes) in write order
+        """
+        objects = list(self._top_level_objects())
+        # Children read lazily are built here so each worker gets them, not the reading document
+        for obj in objects:
+            if isinstance(obj, ComponentDefinition):
+                obj._load_children()
+        # Cached objects are reused and mapped sequences are kept out of the pickled chunks
+        pending = [obj for obj in objects
+                   if self._cached_serialised(obj, key) is None and
+                   not (isinstance(obj, Sequence) and obj.is_mapped)]
+        workers = workers or os.cpu_count()
+        size = max(1, -(-len(pending) // (workers * 4)))
+        chunks = [pending[i:i + size] for i in range(0, len(pending), size)]
+        serialise = partial(_serialise_top_level, self.document_namespace, dict(XML_NS))
+        pending_ids = set(id(obj) for obj in pending)
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            outputs = (output for chunk in executor.map(serialise, chunks) for output in chunk)
+            for obj in objects:
+                if id(obj) in pending_ids:
+                    output = next(outputs)
+                    if key is not None:
+                        obj._serialised = (key, output)
+                else:
+                    output = self._serialise(rdf, obj, key)
+                yield obj, output
+
+    def _write_serialised(self, f, output, obj):
+        output = memoryview(output)
+        if not isinstance(obj, Sequence) or not obj.is_mapped:
+            f.write(output)
+            return
+        # Copy mapped elements straight from the side file in place of their placeholder
+        placeholder = obj.elements.placeholder.encode('ascii')
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(output):
+            if match.group(0) == placeholder:
+                f.write(output[position:match.start()])
+                obj.elements.write_xml_text(f)
+                position = match.end()
+        f.write(output[position:])
+
+def _serialise_top_level(namespace, xml_ns, objects):
+    """
+    Serialise TopLevel objects in a worker process, used by Document.write
+    """
+    XML_NS.clear()
+    XML_NS.update(xml_ns)
+    document = Document(namespace)
+    rdf = ET.Element(NS('rdf', 'RDF'), nsmap=XML_NS)
+    return [document._serialise(rdf, obj) for obj in objects]
+
+
+def _read_document_file(namespace, engine, validate, pack_sequences, path):
+    """
+    Read a single file into a new Document, used by worker processes in Document.read_many
+    """
+    document = Document(namespace, validate=validate, pack_sequences=pack_sequences)
+    with open(path) as f:
+        document.read(f, engine=engine)
+    return document
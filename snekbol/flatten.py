@@ -0,0 +1,95 @@
+from .location import Range, Cut
+from .types import ORIENTATION_TYPES
+from .sequenceops import reverse_complement
+
+REVERSE_COMPLEMENT = (ORIENTATION_TYPES['reverseComplement'], 'reverseComplement')
+
+
+def flatten_sequence(definition):
+    """
+    Full primary sequence of a ComponentDefinition built from the definitions of its components
+
+    The sequences of the components placed by the sequence annotations of definition are joined
+    in order of their first location, reverse complemented when the first location of the
+    annotation has that orientation, and each is worked out the same way in turn. A definition
+    without placed components, or with one whose sequence cannot be worked out, uses the
+    elements of its first Sequence, and is None if it has none.
+
+    The result is kept on each definition and reused until it, or anything below it, changes.
+    """
+    return _flatten(definition, {}, ())[0]
+
+
+def flatten_sequences(definitions):
+    """
+    Flattened sequence of each of definitions by identity, see flatten_sequence
+
+    Checks of the cached sequences are shared between the definitions, so a library with
+    common parts only looks at each part once.
+    """
+    checked = {}
+    return {d.identity: _flatten(d, checked, ())[0] for d in definitions}
+
+
+def _current(entry, checked):
+    """
+    Whether a cached entry was built from the cached entries its components have now
+    """
+    for sub_definition, sub_entry in entry[1]:
+        if sub_definition._flattened is not sub_entry:
+            return False
+        current = checked.get(id(sub_entry))
+        if current is None:
+            current = _current(sub_entry, checked)
+            checked[id(sub_entry)] = current
+        if not current:
+            return False
+    return True
+
+
+def _flatten(definition, checked, path):
+    """
+    Cached (elements, ((sub definition, its entry), ...)) entry of definition, built if needed
+    """
+    entry = definition._flattened
+    if entry is not None:
+        current = checked.get(id(entry))
+        if current is None:
+            current = _current(entry, checked)
+            checked[id(entry)] = current
+        if current:
+            return entry
+    if id(definition) in path:
+        raise ValueError('{} contains itself'.format(definition.identity))
+    path = path + (id(definition),)
+
+    placed = []
+    for annotation in definition.sequence_annotations:
+        if annotation.component is not None and \
+                any(isinstance(l, (Range, Cut)) for l in annotation._locations):
+            placed.append(annotation)
+    placed.sort(key=lambda a: a.first_location)
+
+    parts = []
+    elements = []
+    for annotation in placed:
+        sub_definition = annotation.component.definition
+        sub_entry = _flatten(sub_definition, checked, path)
+        # Kept even when it has no sequence so this entry is rebuilt once it gets one
+        parts.append((sub_definition, sub_entry))
+        if sub_entry[0] is None:
+            break
+        if annotation._locations[0].orientation in REVERSE_COMPLEMENT:
+            elements.append(reverse_complement(sub_entry[0]))
+        else:
+            elements.append(sub_entry[0])
+
+    if len(placed) > 0 and len(elements) == len(placed):
+        entry = (''.join(elements), tuple(parts))
+    else:
+        sequences = definition.sequences
+        entry = (str(sequences[0].elements) if len(sequences) > 0 else None, tuple(parts))
+
+    object.__setattr__(definition, '_flattened', entry)
+    checked[id(entry)] = True
+    return entry
@@ -1,19 +1,199 @@
 import re
+from functools import lru_cache
+from types import MemberDescriptorType
 
 from lxml import etree as ET
 
 from rdflib import BNode, URIRef, Literal, RDF
 from rdflib.namespace import DCTERMS
 
-import validators
-
 from .namespaces import SBOL, PROV, XML_NS, NS
+from .uri import is_url
+
+
+# Attributes that do not change the serialised form of an object
+UNTRACKED_ATTRIBUTES = frozenset(['_serialised', '_parent', '_children_loader', 'rdf_identity',
+                                  '_resolved_identity'])
+
+# Shared by every list attribute that is empty, replaced by a TrackedList when first used
+EMPTY = ()
+
+# Optional attributes kept in the _metadata side table of an object
+METADATA_ATTRIBUTES = ('name', 'was_derived_from', 'version', 'description')
+
+
+@lru_cache(maxsize=None)
+def _slot_names(cls):
+    return tuple(name for klass in cls.__mro__ for name in klass.__dict__.get('__slots__', ()))
+
+
+@lru_cache(maxsize=None)
+def _is_slot(cls, name):
+    # Properties check the value they are given before storing it in a slot
+    return isinstance(getattr(cls, name, None), MemberDescriptorType)
+
+
+class ListAttribute(object):
+    """
+    List attribute of an SBOL object stored in a slot, empty lists are stored as EMPTY
+    """
+    def __init__(self, slot):
+        self.slot = slot
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return self
+        return obj._list(self.slot)
+
+    def __set__(self, obj, value):
+        setattr(obj, self.slot, value)
+
+
+def _metadata_attribute(name):
+    def getter(self):
+        metadata = self._metadata
+        return None if metadata is None else metadata.get(name)
+
+    def setter(self, value):
+        metadata = self._metadata
+        if value is not None:
+            if metadata is None:
+                metadata = {}
+                object.__setattr__(self, '_metadata', metadata)
+            metadata[name] = value
+        elif metadata is not None:
+            metadata.pop(name, None)
+            if len(metadata) == 0:
+                object.__setattr__(self, '_metadata', None)
+
+    return property(getter, setter)
+
+
+class TrackedList(list):
+    """
+    List attribute of an SBOL object that marks the object changed when it is modified
+
+    Child objects added to it that are not TopLevel objects are owned by the object, so changes
+    to them mark it changed as well.
+    """
+    _owner = None
+
+    def __init__(self, owner, values=()):
+        super().__init__(values)
+        self._owner = owner
+        self._adopt(self)
+
+    def _adopt(self, values):
+        for value in values:
+            if isinstance(value, Owned) or (isinstance(value, Identified) and
+                                            not isinstance(value, TopLevel)):
+                object.__setattr__(value, '_parent', self._owner)
+
+    def _changed(self, values=()):
+        if self._owner is not None:
+            self._adopt(values)
+            self._owner._mark_dirty()
+
+    def append(self, value):
+        super().append(value)
+        self._changed([value])
+
+    def extend(self, values):
+        start = len(self)
+        super().extend(values)
+        self._changed(self[start:])
+
+    def insert(self, index, value):
+        super().insert(index, value)
+        self._changed([value])
+
+    def __setitem__(self, index, value):
+        super().__setitem__(index, value)
+        self._changed(value if isinstance(index, slice) else [value])
+
+    def __iadd__(self, values):
+        self.extend(values)
+        return self
+
+    def __delitem__(self, index):
+        super().__delitem__(index)
+        self._changed()
+
+    def remove(self, value):
+        super().remove(value)
+        self._changed()
+
+    def pop(self, *args):
+        value = super().pop(*args)
+        self._changed()
+        return value
+
+    def clear(self):
+        super().clear()
+        self._changed()
+
+    def sort(self, *args, **kwargs):
+        super().sort(*args, **kwargs)
+        self._changed()
+
+    def reverse(self):
+        super().reverse()
+        self._changed()
+
+
+class Owned(object):
+    """
+    Mixin for objects held by SBOL objects that are not Identified themselves, like annotations
+
+    Setting an attribute marks the object holding it as changed, as Identified does. Owned
+    objects assigned to attributes are held by this object and lists are copied into a
+    TrackedList.
+    """
+    _parent = None
+
+    def __setattr__(self, name, value):
+        if type(value) is list:
+            value = TrackedList(self, value)
+        elif isinstance(value, Owned):
+            object.__setattr__(value, '_parent', self)
+        object.__setattr__(self, name, value)
+        if self._parent is not None and name != '_parent':
+            self._mark_dirty()
+
+    def _mark_dirty(self):
+        if self._parent is not None:
+            self._parent._mark_dirty()
 
 
 class Identified(object):
     """
     Mixin to provide identity support to SBOL objects
+
+    Setting an attribute marks the object, and the TopLevel object holding it, as changed so a
+    cached serialised form is not reused. Lists assigned to attributes are copied into a
+    TrackedList to do the same when they are modified, so later changes to the list that was
+    assigned are not seen by the object.
+
+    SBOL objects use __slots__. name, was_derived_from, version and description are kept in a
+    side table that is only created when one of them is set, and empty lists in private slots
+    share EMPTY until they are first used.
     """
+    # _parent is the owning object for objects held by another, _serialised the cached
+    # serialised form of TopLevel objects and _resolved_identity (namespace, identity) from the
+    # last _get_identity call without a postfix
+    __slots__ = ('identity', 'display_id', 'rdf_identity', '_annotations', '_metadata',
+                 '_parent', '_serialised', '_resolved_identity')
+    # Attributes holding objects this object refers to rather than owns
+    _reference_attributes = ()
+    # (key, attribute) pairs of the values a document indexes this object by, see Document.query
+    _index_attributes = ()
+
+    name = _metadata_attribute('name')
+    was_derived_from = _metadata_attribute('was_derived_from')
+    version = _metadata_attribute('version')
+    description = _metadata_attribute('description')
+    annotations = ListAttribute('_annotations')
+
     def __init__(self,
                  identity,
                  name = None,
@@ -22,6 +202,8 @@ class Identified(object):
                  description = None,
                  display_id = None,
                  annotations=[]):
+        for slot in ('_metadata', '_parent', '_serialised', '_resolved_identity'):
+            object.__setattr__(self, slot, None)
         self.identity = identity
         self.name = name
         self.was_derived_from = was_derived_from
@@ -33,18 +215,106 @@ class Identified(object):
         if display_id is None:
             self.display_id = re.sub('[\W_]+', '_', identity)
 
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in _slot_names(type(self))
+                if hasattr(self, name)}
+
+    def __setstate__(self, state):
+        for name in ('_metadata', '_parent', '_serialised', '_resolved_identity'):
+            object.__setattr__(self, name, None)
+        for name, value in state.items():
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        value_type = type(value)
+        if ((value_type is list or (value_type is TrackedList and value._owner is not self)) and
+                _is_slot(type(self), name)):
+            # Only private slots are read through _list, which swaps EMPTY for a TrackedList
+            value = TrackedList(self, value) if len(value) > 0 or name[0] != '_' else EMPTY
+        object.__setattr__(self, name, value)
+        if name == 'identity':
+            object.__setattr__(self, '_resolved_identity', None)
+        # Nothing to drop until the object is held by another or has been serialised
+        if ((self._parent is not None or self._serialised is not None) and
+                name not in UNTRACKED_ATTRIBUTES):
+            self._mark_dirty()
+
+    def _list(self, slot):
+        """
+        The list held in slot, swapping EMPTY for a TrackedList that can be modified
+        """
+        value = getattr(self, slot)
+        if value is EMPTY:
+            value = TrackedList(self)
+            object.__setattr__(self, slot, value)
+        return value
+
+    def _held_objects(self):
+        """
+        Objects in the list attributes of this object that it owns
+        """
+        for name in _slot_names(type(self)):
+            value = getattr(self, name, None)
+            if type(value) is TrackedList:
+                for item in value:
+                    if isinstance(item, Identified) and item._parent is self:
+                        yield item
+
+    def _referenced_objects(self):
+        """
+        Objects referred to by the reference attributes of this object
+        """
+        for name in self._reference_attributes:
+            value = getattr(self, name, None)
+            for obj in value if isinstance(value, (list, tuple)) else (value,):
+                if isinstance(obj, Identified):
+                    yield obj
+
+    def _index_terms(self):
+        """
+        (key, value) pairs a document indexes this object by
+        """
+        for key, name in self._index_attributes:
+            value = getattr(self, name, None)
+            for v in value if isinstance(value, (list, tuple)) else (value,):
+                if v is not None:
+                    yield key, v
+        for a in self._annotations:
+            yield 'annotation', '{}{}'.format(a.q_name.namespace, a.q_name.local_name)
+
+    def _mark_dirty(self):
+        """
+        Drop the cached serialised form of this object and the objects holding it
+        """
+        obj = self
+        while obj is not None:
+            obj._drop_cached()
+            obj = obj._parent
+
+    def _drop_cached(self):
+        """
+        Forget anything kept that was worked out from the current state of the object
+        """
+        if self._serialised is not None:
+            object.__setattr__(self, '_serialised', None)
+
     @property
     def persistent_identitity(self):
         return '{}/{}'.format(self.display_id, self.version)
 
     def _get_identity(self, namespace=None, postfix=None):
+        if postfix is None:
+            resolved = self._resolved_identity
+            if resolved is not None and resolved[0] == namespace:
+                return resolved[1]
         identity = self.identity
         if postfix is not None:
             identity = '{}{}'.format(self.identity, postfix)
-        if not validators.url(identity):
-            return namespace[identity]
-        else:
-            return identity
+        if not is_url(identity):
+            identity = namespace[identity]
+        if postfix is None:
+            object.__setattr__(self, '_resolved_identity', (namespace, identity))
+        return identity
 
     def _get_persistent_identitity(self, namespace):
         if self.version is not None:
@@ -52,13 +322,7 @@ class Identified(object):
         return '{}'.format(self._get_identity(namespace))
 
     def _get_rdf_identity(self, namespace=None, postfix=None):
-        identity = self.identity
-        if postfix is not None:
-            identity = '{}{}'.format(self.identity, postfix)
-        if not validators.url(identity):
-            return URIRef(namespace[identity])
-        else:
-            return URIRef(identity)
+        return URIRef(self._get_identity(namespace, postfix))
 
     def _get_rdf_persistent_identitity(self, namespace):
         if self.version is not None:
@@ -93,22 +357,58 @@ class Identified(object):
             description = ET.Element(NS('dcterms', 'description'))
             description.text = self.description
             elements.append(description)
-        for a in self.annotations:
+        for a in self._annotations:
             elements.append(a._as_rdf_xml(ns))
         return elements
 
 
-class TopLevel(Identified):
+class Indexed(Identified):
     """
-    Mixin to indicate SBOL object is top level and should not be nested
+    Mixin for SBOL objects a document indexes on their own, TopLevel objects and Sequences
     """
-    isToplevel = True
+    # _indexed is the IdentityIndex of a document that indexed the object, told when it changes
+    __slots__ = ('_indexed',)
 
     def __init__(self, identity, **kwargs):
+        object.__setattr__(self, '_indexed', None)
         super().__init__(identity, **kwargs)
 
+    def __getstate__(self):
+        state = super().__getstate__()
+        state.pop('_indexed', None)
+        return state
+
+    def __setstate__(self, state):
+        super().__setstate__(state)
+        object.__setattr__(self, '_indexed', None)
+
+    def __setattr__(self, name, value):
+        super().__setattr__(name, value)
+        if self._indexed is not None and name not in UNTRACKED_ATTRIBUTES:
+            self._unindex()
+
+    def _drop_cached(self):
+        super()._drop_cached()
+        if self._indexed is not None:
+            self._unindex()
+
+    def _unindex(self):
+        index = self._indexed
+        object.__setattr__(self, '_indexed', None)
+        index.changed(self)
+
+
+class TopLevel(Indexed):
+    """
+    Mixin to indicate SBOL object is top level and should not be nested
+    """
+    __slots__ = ()
+    isToplevel = True
+
 
 class GenericTopLevel(TopLevel):
+    __slots__ = ('rdf_type',)
+
     def __init__(self, identity, rdf_type, **kwargs):
         super().__init__(identity, **kwargs)
         self.rdf_type = rdf_type
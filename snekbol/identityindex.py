@@ -0,0 +1,224 @@
+class IdentityIndex(object):
+    """
+    Index from identity to object over top level objects and the objects they hold
+
+    Each entry is (object, top level object holding it), the second None for the top level
+    objects themselves. The objects referring to each identity are kept the same way, and the
+    objects of each class and with each (key, value) term given by _index_terms in sets. A top
+    level object changed since it was indexed is indexed again when one of its entries is
+    looked up, objects added to it are found once refresh is called. Changed top level objects
+    tell the index they were indexed by, so refresh only looks at those.
+    """
+    def __init__(self):
+        self._entries = {}
+        # Identities of the objects held by each indexed top level object
+        self._held = {}
+        # identity -> {id(referrer): (referrer, top level object holding it)}
+        self._referrers = {}
+        # (identity referred to, id(referrer)) pairs added for each top level object
+        self._held_references = {}
+        # Objects by class and by (key, value) term, and what was added for each top level object
+        self._classes = {}
+        self._terms = {}
+        self._held_terms = {}
+        # id(top level object) -> identity it was indexed by, and the top level objects changed
+        # since or with children still to be built, by id
+        self._top_keys = {}
+        self._dirty = {}
+        self._unloaded = {}
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, identity):
+        return self.get(identity) is not None
+
+    @staticmethod
+    def _key(identity):
+        # rdflib terms do not compare equal to str
+        if type(identity) is not str:
+            identity = str.__str__(identity)
+        return identity
+
+    def add(self, top_level):
+        """
+        Index top_level and every object it holds, replacing what was indexed for it before
+        """
+        identity = self._key(top_level.identity)
+        previous = self._entries.get(identity)
+        if previous is not None and previous[1] is None:
+            self._remove_top_level(identity, previous[0])
+        self._entries[identity] = (top_level, None)
+        self._top_keys[id(top_level)] = identity
+
+        held = []
+        references = []
+        terms = []
+        self._add_references(top_level, top_level, references)
+        self._add_terms(top_level, terms)
+        pending = list(top_level._held_objects())
+        while pending:
+            obj = pending.pop()
+            key = self._key(obj.identity)
+            entry = self._entries.get(key)
+            # Sequences are held by ComponentDefinitions but also indexed as top level objects
+            if entry is None or entry[1] is not None:
+                self._entries[key] = (obj, top_level)
+                held.append(key)
+                self._add_references(obj, top_level, references)
+                self._add_terms(obj, terms)
+            pending.extend(obj._held_objects())
+        self._held[identity] = held
+        self._held_references[identity] = references
+        self._held_terms[identity] = terms
+        self._dirty.pop(id(top_level), None)
+        if hasattr(top_level, '_indexed'):
+            object.__setattr__(top_level, '_indexed', self)
+        if not getattr(top_level, 'children_loaded', True):
+            self._unloaded[id(top_level)] = top_level
+
+    def _add_references(self, obj, top_level, references):
+        for target in obj._referenced_objects():
+            key = self._key(target.identity)
+            self._referrers.setdefault(key, {})[id(obj)] = (obj, top_level)
+            references.append((key, id(obj)))
+
+    def _add_terms(self, obj, terms):
+        objects = self._classes.setdefault(type(obj), set())
+        objects.add(obj)
+        terms.append((objects, obj))
+        identity = self._key(obj.identity)
+        # The namespace of an identity is taken to be everything up to its last / or #
+        end = max(identity.rfind('/'), identity.rfind('#'))
+        term_list = list(obj._index_terms())
+        if end > 0 and '://' in identity:
+            term_list.append(('namespace', identity[:end + 1]))
+        for key, value in term_list:
+            objects = self._terms.setdefault((key, self._key(value)), set())
+            objects.add(obj)
+            terms.append((objects, obj))
+
+    def remove(self, top_level):
+        """
+        Remove top_level and the objects it holds from the index
+        """
+        identity = self._top_keys.get(id(top_level), self._key(top_level.identity))
+        entry = self._entries.get(identity)
+        if entry is not None and entry[0] is top_level:
+            del self._entries[identity]
+            self._remove_top_level(identity, top_level)
+        self._dirty.pop(id(top_level), None)
+
+    def _remove_top_level(self, identity, top_level):
+        self._top_keys.pop(id(top_level), None)
+        self._unloaded.pop(id(top_level), None)
+        if getattr(top_level, '_indexed', None) is self:
+            object.__setattr__(top_level, '_indexed', None)
+        for key in self._held.pop(identity, ()):
+            entry = self._entries.get(key)
+            if entry is not None and entry[1] is top_level:
+                del self._entries[key]
+        for key, referrer_id in self._held_references.pop(identity, ()):
+            referrers = self._referrers.get(key)
+            if referrers is not None and referrers.get(referrer_id, (None, None))[1] is top_level:
+                del referrers[referrer_id]
+                if len(referrers) == 0:
+                    del self._referrers[key]
+        for objects, obj in self._held_terms.pop(identity, ()):
+            objects.discard(obj)
+
+    def get(self, identity):
+        """
+        (object, top level object holding it) for identity, None if it is not indexed
+        """
+        key = self._key(identity)
+        entry = self._entries.get(key)
+        if entry is not None:
+            top_level = entry[0] if entry[1] is None else entry[1]
+            if id(top_level) in self._dirty:
+                self._reindex(self._dirty.pop(id(top_level)))
+                entry = self._entries.get(key)
+        return entry
+
+    def held(self, identity):
+        """
+        Identities of the objects held by the top level object with identity
+        """
+        return list(self._held.get(self._key(identity), ()))
+
+    def referrers(self, identity):
+        """
+        (object, top level object holding it) for each object referring to identity
+
+        Only as current as the last refresh of the top level objects holding the referrers.
+        """
+        return list(self._referrers.get(self._key(identity), {}).values())
+
+    def instances(self, cls):
+        """
+        Indexed objects that are instances of cls
+        """
+        found = set()
+        for klass, objects in self._classes.items():
+            if issubclass(klass, cls):
+                found.update(objects)
+        return found
+
+    def matching(self, key, value):
+        """
+        Indexed objects with the term (key, value), do not modify the set returned
+        """
+        return self._terms.get((key, self._key(value)), frozenset())
+
+    def changed(self, top_level):
+        """
+        Index top_level again on the next refresh, or for the first time if it is not indexed
+        """
+        self._dirty[id(top_level)] = top_level
+
+    def refresh(self):
+        """
+        Index again the top level objects changed since they were indexed
+
+        Children of ComponentDefinitions read lazily are built first so the objects they hold
+        are found. Top level objects replaced by another with the same identity are left out.
+        """
+        unloaded, self._unloaded = self._unloaded, {}
+        for top_level in unloaded.values():
+            top_level._load_children()
+        dirty, self._dirty = self._dirty, {}
+        for top_level in dirty.values():
+            self._reindex(top_level)
+
+    def _reindex(self, top_level):
+        identity = self._top_keys.get(id(top_level))
+        previous = ()
+        if identity is not None:
+            entry = self._entries.get(identity)
+            if entry is None or entry[0] is not top_level:
+                return
+            previous = [identity] + self._held[identity]
+            if identity != self._key(top_level.identity):
+                self.remove(top_level)
+        self.add(top_level)
+        # Objects referring to an identity that is gone drop their cached serialised form
+        for key in previous:
+            entry = self._entries.get(key)
+            if entry is None or (entry[0] if entry[1] is None else entry[1]) is not top_level:
+                for referrer, _ in list(self._referrers.get(key, {}).values()):
+                    referrer._mark_dirty()
+
+    def clear(self):
+        for top_level, holder in self._entries.values():
+            if holder is None and getattr(top_level, '_indexed', None) is self:
+                object.__setattr__(top_level, '_indexed', None)
+        self._entries.clear()
+        self._held.clear()
+        self._referrers.clear()
+        self._held_references.clear()
+        self._classes.clear()
+        self._terms.clear()
+        self._held_terms.clear()
+        self._top_keys.clear()
+        self._dirty.clear()
+        self._unloaded.clear()
@@ -0,0 +1,77 @@
+from bisect import bisect_right
+
+
+class IntervalIndex(object):
+    """
+    Static index over closed integer intervals (start, end, value)
+
+    Intervals are sorted by start and each node of the implicit binary tree over them keeps the
+    largest end below it, so overlap queries take O(log n + k) and nearest queries O(log n).
+    """
+    def __init__(self, intervals):
+        intervals = sorted(intervals, key=lambda i: (i[0], i[1]))
+        self._starts = [i[0] for i in intervals]
+        self._ends = [i[1] for i in intervals]
+        self._values = [i[2] for i in intervals]
+        self._max_ends = list(self._ends)
+        self._build(0, len(intervals))
+        # Index of the interval with the largest end among the first i + 1 intervals
+        self._prefix_max = []
+        best = None
+        for i, end in enumerate(self._ends):
+            if best is None or end > self._ends[best]:
+                best = i
+            self._prefix_max.append(best)
+
+    def _build(self, lo, hi):
+        if lo >= hi:
+            return None
+        mid = (lo + hi) // 2
+        for child in (self._build(lo, mid), self._build(mid + 1, hi)):
+            if child is not None and child > self._max_ends[mid]:
+                self._max_ends[mid] = child
+        return self._max_ends[mid]
+
+    def __len__(self):
+        return len(self._starts)
+
+    def overlapping(self, start, end):
+        """
+        Values of intervals sharing at least one position with start..end, ordered by start
+        """
+        found = []
+        pending = [(0, len(self._starts))]
+        while pending:
+            lo, hi = pending.pop()
+            if lo >= hi:
+                continue
+            mid = (lo + hi) // 2
+            # Nothing under this node reaches start
+            if self._max_ends[mid] < start:
+                continue
+            pending.append((lo, mid))
+            if self._starts[mid] <= end:
+                if self._ends[mid] >= start:
+                    found.append(mid)
+                pending.append((mid + 1, hi))
+        return [self._values[i] for i in sorted(found)]
+
+    def containing(self, position):
+        """
+        Values of intervals that include position, ordered by start
+        """
+        return self.overlapping(position, position)
+
+    def nearest(self, position):
+        """
+        Value of the interval closest to position (one containing it if there is any)
+        """
+        after = bisect_right(self._starts, position)
+        best, distance = None, None
+        if after > 0:
+            left = self._prefix_max[after - 1]
+            best, distance = left, max(0, position - self._ends[left])
+        if after < len(self._starts) and (best is None or
+                                          self._starts[after] - position < distance):
+            best = after
+        return None if best is None else self._values[best]
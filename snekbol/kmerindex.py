@@ -0,0 +1,279 @@
+import re
+from array import array
+from bisect import bisect_left, bisect_right
+from itertools import product
+
+from .sequenceops import reverse_complement
+from .sequencestore import CHUNK_SIZE
+
+# Bases matched by each IUPAC nucleotide code in a motif
+IUPAC_CODES = {
+    'a': 'a', 'c': 'c', 'g': 'g', 't': 't', 'u': 'u',
+    'r': 'ag', 'y': 'ct', 's': 'cg', 'w': 'at', 'k': 'gt', 'm': 'ac',
+    'b': 'cgt', 'd': 'agt', 'h': 'act', 'v': 'acg', 'n': 'acgt',
+}
+STRANDS = ('+', '-')
+
+
+def motif_pattern(motif):
+    """
+    Compiled case insensitive regular expression matching the IUPAC nucleotide motif
+    """
+    parts = []
+    for code in motif.lower():
+        bases = IUPAC_CODES.get(code)
+        if bases is None:
+            raise ValueError('"{}" is not an IUPAC nucleotide code'.format(code))
+        parts.append(bases if len(bases) == 1 else '[{}]'.format(bases))
+    return re.compile(''.join(parts), re.IGNORECASE)
+
+
+def _expansions(motif):
+    """
+    Number of sequences the IUPAC motif stands for
+    """
+    count = 1
+    for code in motif:
+        count *= len(IUPAC_CODES[code])
+    return count
+
+
+def _overlapping(pattern):
+    """
+    Pattern finding overlapping matches of pattern with finditer
+    """
+    return re.compile('(?=(?:{}))'.format(pattern.pattern), re.IGNORECASE)
+
+
+def _chunks(elements, overlap, chunk_size):
+    """
+    (start, text) of elements in chunks of chunk_size running on overlap characters into the next
+
+    Only one chunk of MappedSequence or PackedSequence elements is held as a str at a time.
+    """
+    for start in range(0, len(elements), chunk_size):
+        yield start, str(elements[start:start + chunk_size + overlap])
+
+
+def _expand(motif):
+    """
+    Every sequence of bases the IUPAC motif stands for
+    """
+    return [''.join(bases) for bases in product(*(IUPAC_CODES[code] for code in motif))]
+
+
+class KmerIndex(object):
+    """
+    Index from each k letter substring to where it occurs in a set of sequences
+
+    Postings are kept as (sequence number << 32 | offset) in an array per k-mer. A motif is
+    looked up on each strand by the k-mers of its window with the fewest IUPAC expansions, and
+    every candidate is checked against the sequence, so hits are exact. A motif shorter than k
+    is looked up by the k-mers starting with it, and the last k - 1 bases of each sequence,
+    where no k-mer starts, are scanned. A motif with more than max_expansions expansions is
+    found by scanning every sequence. Removed sequences are dropped from the postings once they
+    make up half of what is indexed. Sequences are read chunk_size bases at a time when they are
+    indexed or scanned.
+    """
+    def __init__(self, k=8, max_expansions=256, chunk_size=CHUNK_SIZE):
+        if k < 1:
+            raise ValueError('k must be at least 1')
+        self.k = k
+        self.max_expansions = max_expansions
+        self.chunk_size = chunk_size
+        self._postings = {}
+        # Sorted k-mers of _postings, None until a short motif is looked up after new ones
+        self._sorted_kmers = None
+        # (last k - 1 bases of every sequence joined by '|', where each starts, the sequences)
+        self._tails = None
+        # Sequence number -> (identity, elements), None once removed
+        self._sequences = []
+        self._numbers = {}
+        self._removed = 0
+
+    def __len__(self):
+        return len(self._numbers)
+
+    def __contains__(self, identity):
+        return self._key(identity) in self._numbers
+
+    @staticmethod
+    def _key(identity):
+        # rdflib terms do not compare equal to str
+        if type(identity) is not str:
+            identity = str.__str__(identity)
+        return identity
+
+    def add(self, identity, elements):
+        """
+        Index elements under identity, replacing what was indexed for it before
+        """
+        identity = self._key(identity)
+        self.remove(identity)
+        number = len(self._sequences)
+        self._sequences.append((identity, elements))
+        self._numbers[identity] = number
+        self._tails = None
+
+        k = self.k
+        postings = self._postings
+        # Each chunk runs on k - 1 bases so the k-mers starting at its end are complete
+        for start, text in _chunks(elements, k - 1, self.chunk_size):
+            text = text.lower()
+            base = number << 32 | start
+            for offset in range(len(text) - k + 1):
+                kmer = text[offset:offset + k]
+                offsets = postings.get(kmer)
+                if offsets is None:
+                    offsets = postings[kmer] = array('Q')
+                    self._sorted_kmers = None
+                offsets.append(base + offset)
+
+    def remove(self, identity):
+        """
+        Remove the sequence indexed under identity, if there is one
+        """
+        number = self._numbers.pop(self._key(identity), None)
+        if number is None:
+            return
+        self._sequences[number] = None
+        self._tails = None
+        self._removed += 1
+        if self._removed > len(self._numbers):
+            self._rebuild()
+
+    def _rebuild(self):
+        sequences = [s for s in self._sequences if s is not None]
+        self.clear()
+        for identity, elements in sequences:
+            self.add(identity, elements)
+
+    def sync(self, sequences):
+        """
+        Index Sequence objects not indexed or with different elements, remove all others
+        """
+        seen = set()
+        for sequence in sequences:
+            identity = self._key(sequence.identity)
+            seen.add(identity)
+            number = self._numbers.get(identity)
+            if number is None or self._sequences[number][1] is not sequence.elements:
+                self.add(identity, sequence.elements)
+        for identity in [i for i in self._numbers if i not in seen]:
+            self.remove(identity)
+
+    def search(self, motif):
+        """
+        Sorted (identity, position, strand) of each occurrence of the IUPAC motif
+
+        Positions are 1-based and give the first base of the hit on the + strand, a hit of the
+        reverse complement of motif has strand '-'.
+        """
+        motif = motif.lower()
+        if len(motif) == 0:
+            raise ValueError('Cannot search for an empty motif')
+        hits = []
+        for strand, strand_motif in zip(STRANDS, (motif, reverse_complement(motif))):
+            pattern = motif_pattern(strand_motif)
+            if len(strand_motif) < self.k:
+                if _expansions(strand_motif) > self.max_expansions:
+                    found = self._scan(pattern, len(strand_motif))
+                else:
+                    found = self._prefix_lookup(strand_motif, pattern)
+            else:
+                found = self._window_lookup(strand_motif, pattern)
+            hits.extend((identity, start + 1, strand) for identity, start in found)
+        hits.sort()
+        return hits
+
+    def _window_lookup(self, motif, pattern):
+        """
+        (identity, start) of motif, at least k long, checked from the k-mers of one window
+        """
+        k = self.k
+        length = len(motif)
+        offset = min(range(length - k + 1), key=lambda o: _expansions(motif[o:o + k]))
+        window = motif[offset:offset + k]
+        if _expansions(window) > self.max_expansions:
+            return self._scan(pattern, length)
+
+        found = []
+        mask = (1 << 32) - 1
+        for kmer in _expand(window):
+            for posting in self._postings.get(kmer, ()):
+                entry = self._sequences[posting >> 32]
+                if entry is None:
+                    continue
+                start = (posting & mask) - offset
+                elements = entry[1]
+                if start >= 0 and start + length <= len(elements) and \
+                        pattern.fullmatch(str(elements[start:start + length])):
+                    found.append((entry[0], start))
+        return found
+
+    def _prefix_lookup(self, motif, pattern):
+        """
+        (identity, start) of motif, shorter than k, from the k-mers starting with it
+        """
+        if self._sorted_kmers is None:
+            self._sorted_kmers = sorted(self._postings)
+        kmers = self._sorted_kmers
+
+        found = []
+        mask = (1 << 32) - 1
+        for prefix in _expand(motif):
+            i = bisect_left(kmers, prefix)
+            while i < len(kmers) and kmers[i].startswith(prefix):
+                for posting in self._postings[kmers[i]]:
+                    entry = self._sequences[posting >> 32]
+                    if entry is not None:
+                        found.append((entry[0], posting & mask))
+                i += 1
+        # No k-mer starts in the last k - 1 bases of a sequence
+        if self._tails is None:
+            self._tails = self._join_tails()
+        text, starts, entries = self._tails
+        for match in _overlapping(pattern).finditer(text):
+            i = bisect_right(starts, match.start()) - 1
+            identity, elements = entries[i]
+            tail = max(0, len(elements) - self.k + 1)
+            found.append((identity, tail + match.start() - starts[i]))
+        return found
+
+    def _join_tails(self):
+        tails = []
+        starts = []
+        entries = []
+        position = 0
+        for entry in self._sequences:
+            if entry is not None:
+                elements = entry[1]
+                tail = str(elements[max(0, len(elements) - self.k + 1):])
+                tails.append(tail)
+                starts.append(position)
+                entries.append(entry)
+                position += len(tail) + 1
+        return '|'.join(tails), starts, entries
+
+    def _scan(self, pattern, length):
+        """
+        (identity, start) of each match of pattern, length bases long, in every sequence
+        """
+        overlapping = _overlapping(pattern)
+        chunk_size = self.chunk_size
+        found = []
+        for entry in self._sequences:
+            if entry is not None:
+                # Matches starting in the overlap are found again in the next chunk
+                for start, text in _chunks(entry[1], length - 1, chunk_size):
+                    found.extend((entry[0], start + m.start()) for m in overlapping.finditer(text)
+                                 if m.start() < chunk_size)
+        return found
+
+    def clear(self):
+        self._postings.clear()
+        self._sorted_kmers = None
+        self._tails = None
+        self._sequences = []
+        self._numbers.clear()
+        self._removed = 0
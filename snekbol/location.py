@@ -7,10 +7,19 @@ from .types import *
 from .namespaces import SBOL, NS
 
 
+def _parse_position(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
 class Location(Identified):
     """
     Mixin for use in Location classes
     """
+    __slots__ = ('orientation',)
+
     def __init__(self,
                  identity,
                  orientation=None,
@@ -18,6 +27,13 @@ class Location(Identified):
         super().__init__(identity, **kwargs)
         self.orientation = orientation
 
+    @property
+    def position(self):
+        """
+        Lowest position covered, as an int, or None when the location has no fixed position
+        """
+        return None
+
     def _as_rdf_xml(self, ns):
         elements = super()._as_rdf_xml(ns)
         if self.orientation is not None:
@@ -29,6 +45,8 @@ class Range(Location):
     """
     Specifies a region via discrete, inclusive start and end positions for a Sequence
     """
+    __slots__ = ('_start', 'end', '_position')
+
     def __init__(self,
                  identity,
                  start,
@@ -38,6 +56,22 @@ class Range(Location):
         self.start = start
         self.end = end
 
+    @property
+    def start(self):
+        return self._start
+
+    @start.setter
+    def start(self, value):
+        self._start = value
+        # Parsed once here so ordering annotations does not parse it again
+        object.__setattr__(self, '_position', _parse_position(value))
+
+    @property
+    def position(self):
+        if self._position is None:
+            return int(self._start)
+        return self._position
+
     def _as_rdf_xml(self, ns):
         elements = super()._as_rdf_xml(ns)
         range_elem = ET.Element(NS('sbol', 'Range'),
@@ -53,6 +87,8 @@ class Cut(Location):
     """
     Specifies a region between two discrete positions in a Sequence
     """
+    __slots__ = ('_at', '_position')
+
     def __init__(self,
                  identity,
                  at,
@@ -60,6 +96,21 @@ class Cut(Location):
         super().__init__(identity, **kwargs)
         self.at = at
 
+    @property
+    def at(self):
+        return self._at
+
+    @at.setter
+    def at(self, value):
+        self._at = value
+        object.__setattr__(self, '_position', _parse_position(value))
+
+    @property
+    def position(self):
+        if self._position is None:
+            return int(self._at)
+        return self._position
+
     def _as_rdf_xml(self, ns):
         elements = super()._as_rdf_xml(ns)
         cut_elem = ET.Element(NS('sbol', 'Cut'),
@@ -74,6 +125,8 @@ class GenericLocation(Location):
     """
     Specifies regions with different encoding properties and potentially nonlinear structure
     """
+    __slots__ = ()
+
     def __init__(self,
                  identity,
                  **kwargs):
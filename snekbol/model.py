@@ -1,6 +1,6 @@
 from lxml import etree as ET
 
-from .identified import Identified, TopLevel
+from .identified import Identified, TopLevel, ListAttribute
 from .types import *
 from .namespaces import NS
 from .components import FunctionalComponent
@@ -10,6 +10,8 @@ class Model(TopLevel):
     """
     Serve as a placeholder for an external computational model and provide additional meta-data
     """
+    __slots__ = ('source', 'language', 'framework')
+
     def __init__(self,
                  identity,
                  source,
@@ -38,6 +40,16 @@ class ModuleDefinition(TopLevel):
     """
     Represents a grouping of structural and functional entities in a biological design
     """
+    __slots__ = ('_roles', '_modules', '_functional_components', '_interactions', '_models')
+    _reference_attributes = ('_models',)
+    _index_attributes = (('role', '_roles'),)
+
+    roles = ListAttribute('_roles')
+    modules = ListAttribute('_modules')
+    functional_components = ListAttribute('_functional_components')
+    interactions = ListAttribute('_interactions')
+    models = ListAttribute('_models')
+
     def __init__(self,
                  identity,
                  roles=[],
@@ -58,18 +70,18 @@ class ModuleDefinition(TopLevel):
         module = ET.Element(NS('sbol', 'ModuleDefinition'), attrib={NS('rdf', 'about'):
                                                                     self.rdf_identity})
         module.extend(elements)
-        for r in self.roles:
+        for r in self._roles:
             role = ET.SubElement(module, NS('sbol', 'role'), attrib={NS('rdf', 'resource'): r})
-        for m in self.models:
+        for m in self._models:
             model = ET.SubElement(module, NS('sbol', 'model'), attrib={NS('rdf', 'resource'):
                                                                        m._get_identity(ns)})
-        for f in self.functional_components:
+        for f in self._functional_components:
             func_comp = ET.SubElement(module, NS('sbol', 'functionalComponent'))
             func_comp.append(f._as_rdf_xml(ns))
-        for m in self.modules:
+        for m in self._modules:
             mod = ET.SubElement(module, NS('sbol', 'module'))
             mod.append(m._as_rdf_xml(ns))
-        for i in self.interactions:
+        for i in self._interactions:
             interaction = ET.SubElement(module, NS('sbol', 'interaction'))
             interaction.append(i._as_rdf_xml(ns))
         return module
@@ -79,6 +91,11 @@ class Module(Identified):
     """
     Represents the usage or occurrence of a ModuleDefinition within a larger design
     """
+    __slots__ = ('definition', '_maps_to')
+    _reference_attributes = ('definition',)
+
+    maps_to = ListAttribute('_maps_to')
+
     def __init__(self,
                  identity,
                  definition,
@@ -95,7 +112,7 @@ class Module(Identified):
         definition = ET.SubElement(module, NS('sbol', 'definition'),
                                    attrib={NS('rdf', 'resource'):
                                            self.definition._get_identity(ns)})
-        for m in self.maps_to:
+        for m in self._maps_to:
             map_to = ET.SubElement(module, NS('sbol', 'mapsTo'))
             map_to.append(m._as_rdf_xml(ns))
         return module
@@ -105,6 +122,12 @@ class Interaction(Identified):
     """
     Describes how FunctionalComponents of a ModuleDefinition are intended to work together
     """
+    __slots__ = ('_types', '_participations')
+    _index_attributes = (('type', '_types'),)
+
+    types = ListAttribute('_types')
+    participations = ListAttribute('_participations')
+
     def __init__(self,
                  identity,
                  types,
@@ -118,9 +141,9 @@ class Interaction(Identified):
         elements = super()._as_rdf_xml(ns)
         interaction = ET.Element(NS('sbol', 'Interaction'),
                                  attrib={NS('rdf', 'about'): self.rdf_identity})
-        for t in self.types:
+        for t in self._types:
             tp = ET.SubElement(interaction, NS('sbol', 'type'), attrib={NS('rdf', 'resource'): t})
-        for p in self.participations:
+        for p in self._participations:
             pt = ET.SubElement(interaction, NS('sbol', 'participation'))
             pt.append(p._as_rdf_xml(ns))
         return interaction
@@ -130,6 +153,10 @@ class Participation(Identified):
     """
     Represents how a particular FunctionalComponent behaves in its parent Interaction
     """
+    __slots__ = ('_roles', '_participant')
+    _reference_attributes = ('_participant',)
+    _index_attributes = (('role', '_roles'),)
+
     def __init__(self,
                  identity,
                  roles,
@@ -141,7 +168,7 @@ class Participation(Identified):
 
     @property
     def roles(self):
-        return self._roles
+        return self._list('_roles')
 
     @roles.setter
     def roles(self, value):
@@ -164,7 +191,7 @@ class Participation(Identified):
         participation = ET.Element(NS('sbol', 'Participation'),
                                  attrib={NS('rdf', 'about'): self.rdf_identity})
         participation.extend(elements)
-        for r in self.roles:
+        for r in self._roles:
             rl = ET.SubElement(participation, NS('sbol', 'role'),
                                attrib={NS('rdf', 'resource'): r})
         participant = ET.SubElement(participation, NS('sbol', 'participant'),
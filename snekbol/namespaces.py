@@ -1,4 +1,5 @@
 from rdflib import Namespace
+from rdflib.namespace import split_uri
 
 SBOL = Namespace('http://sbols.org/v2#')
 PROV = Namespace('http://www.w3.org/ns/prov#')
@@ -11,7 +12,7 @@ XML_NS = {
 }
 
 # Valid elements that can be used in an SBOL file
-VALID_ENTITIES = [
+VALID_ENTITIES = frozenset([
     'rdf:type',
     'sbol:persistentIdentity',
     'sbol:displayId',
@@ -70,10 +71,41 @@ VALID_ENTITIES = [
     'sbol:participant',
     'sbol:Collection',
     'sbol:member',
-]
+])
 
 def NS(namespace, tag):
     """
     Generate a namespaced tag for use in creation of an XML file
     """
     return '{' + XML_NS[namespace] + '}' + tag
+
+
+class NamespaceResolver(object):
+    """
+    Memoised split of predicate and type URIs into (namespace, local name, prefix, is_core_sbol)
+
+    is_core_sbol is True when the prefixed name is one of VALID_ENTITIES, anything else is read as
+    an annotation.
+    """
+    def __init__(self, namespaces=None):
+        self._prefixes = {}
+        self._resolved = {}
+        if namespaces is not None:
+            for prefix, namespace in namespaces.items():
+                self.add(prefix, namespace)
+
+    def add(self, prefix, namespace):
+        self._prefixes[namespace] = prefix
+        # Previously resolved URIs may now map to a different prefix
+        self._resolved.clear()
+
+    def resolve(self, uri):
+        try:
+            return self._resolved[uri]
+        except KeyError:
+            namespace, local_name = split_uri(uri)
+            prefix = self._prefixes[namespace]
+            is_core_sbol = '{}:{}'.format(prefix, local_name) in VALID_ENTITIES
+            resolved = (namespace, local_name, prefix, is_core_sbol)
+            self._resolved[uri] = resolved
+            return resolved
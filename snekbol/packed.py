@@ -0,0 +1,206 @@
+import sys
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Nucleotides stored in two bits, anything else is kept in an exception list
+NUCLEOTIDE_CODES = {'A': 0, 'C': 1, 'G': 2, 'T': 3, 'U': 3}
+
+if np is not None:
+    _CODE_TABLE = np.full(256, 255, dtype=np.uint8)
+    for _base, _code in NUCLEOTIDE_CODES.items():
+        _CODE_TABLE[ord(_base)] = _code
+        _CODE_TABLE[ord(_base.lower())] = _code
+    _SHIFTS = np.array([6, 4, 2, 0], dtype=np.uint8)
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError('NumPy is required for packed sequences')
+
+
+class PackedSequence(object):
+    """
+    IUPAC nucleotide sequence stored as a 2-bit array, four bases per byte
+
+    Bases are decoded with a single four letter alphabet (acgt, ACGT, acgu or ACGU) picked from
+    the sequence. Characters outside it, such as ambiguity codes or a change of case, are kept
+    with their positions in an exception list. Behaves like a read only str: str(), len(),
+    indexing, slicing, iteration, comparison and concatenation are supported.
+    """
+    __slots__ = ('_packed', '_length', 'alphabet', '_positions', '_characters')
+
+    def __init__(self, elements):
+        _require_numpy()
+        raw = np.frombuffer(elements.encode('ascii'), dtype=np.uint8)
+        alphabet = self._pick_alphabet(elements)
+        codes = _CODE_TABLE[raw]
+        unknown = codes == 255
+        codes[unknown] = 0
+        expected = np.frombuffer(alphabet.encode('ascii'), dtype=np.uint8)[codes]
+        positions = np.flatnonzero(unknown | (expected != raw))
+        self._set(codes, len(elements), alphabet, positions, raw[positions])
+
+    @staticmethod
+    def _pick_alphabet(elements):
+        first = next((c for c in elements if c.upper() in NUCLEOTIDE_CODES), 'a')
+        alphabet = 'acgt' if first.islower() else 'ACGT'
+        if ('u' in elements or 'U' in elements) and not ('t' in elements or 'T' in elements):
+            alphabet = alphabet[:3] + ('u' if first.islower() else 'U')
+        return alphabet
+
+    @classmethod
+    def _from_codes(cls, codes, alphabet, positions, characters):
+        packed = cls.__new__(cls)
+        packed._set(codes, len(codes), alphabet, positions, characters)
+        return packed
+
+    def _set(self, codes, length, alphabet, positions, characters):
+        # Kept as bytes, which cost far less per object than arrays, and viewed with NumPy
+        padded = np.zeros((length + 3) // 4 * 4, dtype=np.uint8)
+        padded[:length] = codes
+        self._packed = np.bitwise_or.reduce(padded.reshape(-1, 4) << _SHIFTS, axis=1).tobytes()
+        self._length = length
+        self.alphabet = alphabet
+        self._positions = np.asarray(positions, dtype=np.int64).tobytes()
+        self._characters = np.asarray(characters, dtype=np.uint8).tobytes()
+
+    @property
+    def _exception_positions(self):
+        return np.frombuffer(self._positions, dtype=np.int64)
+
+    @property
+    def _exception_characters(self):
+        return np.frombuffer(self._characters, dtype=np.uint8)
+
+    @classmethod
+    def concatenate(cls, parts):
+        """
+        Join sequences (packed or str) into one packed sequence without decoding packed parts
+        """
+        _require_numpy()
+        parts = [p if isinstance(p, PackedSequence) else cls(p) for p in parts]
+        if len(parts) == 0:
+            return cls('')
+        alphabet = parts[0].alphabet
+        if any(p.alphabet != alphabet for p in parts):
+            return cls(''.join(str(p) for p in parts))
+        offsets = np.cumsum([0] + [len(p) for p in parts[:-1]])
+        codes = np.concatenate([p.codes() for p in parts])
+        positions = np.concatenate([p._exception_positions + o for p, o in zip(parts, offsets)])
+        characters = np.concatenate([p._exception_characters for p in parts])
+        return cls._from_codes(codes, alphabet, positions, characters)
+
+    def codes(self, start=0, stop=None):
+        """
+        NumPy array of the 2-bit codes (A=0, C=1, G=2, T/U=3) from start to stop
+
+        Exception positions hold the code of their base if they have one, otherwise 0.
+        """
+        stop = self._length if stop is None else stop
+        if stop <= start:
+            return np.zeros(0, dtype=np.uint8)
+        first_byte = start // 4
+        packed = np.frombuffer(self._packed, dtype=np.uint8, offset=first_byte,
+                               count=(stop + 3) // 4 - first_byte)
+        unpacked = (packed[:, None] >> _SHIFTS) & 3
+        offset = start - first_byte * 4
+        return unpacked.reshape(-1)[offset:offset + stop - start]
+
+    def to_bytes(self):
+        """
+        The sequence as ASCII bytes
+        """
+        characters = np.frombuffer(self.alphabet.encode('ascii'), dtype=np.uint8)[self.codes()]
+        characters[self._exception_positions] = self._exception_characters
+        return characters.tobytes()
+
+    def counts(self):
+        """
+        Number of times each character occurs, like collections.Counter(str(self))
+        """
+        totals = np.bincount(self.codes(), minlength=4)
+        exception_codes = self.codes()[self._exception_positions]
+        totals = totals - np.bincount(exception_codes, minlength=4)
+        counts = {base: int(total) for base, total in zip(self.alphabet, totals) if total > 0}
+        values, occurrences = np.unique(self._exception_characters, return_counts=True)
+        for value, occurrence in zip(values, occurrences):
+            character = chr(value)
+            counts[character] = counts.get(character, 0) + int(occurrence)
+        return counts
+
+    def count(self, sub):
+        if len(sub) == 1:
+            return self.counts().get(sub, 0)
+        return str(self).count(sub)
+
+    @property
+    def nbytes(self):
+        """
+        Bytes used by the object, its packed data and exception list
+        """
+        return (sys.getsizeof(self) + sys.getsizeof(self._packed) +
+                sys.getsizeof(self._positions) + sys.getsizeof(self._characters))
+
+    def __str__(self):
+        return self.to_bytes().decode('ascii')
+
+    def __repr__(self):
+        return 'PackedSequence({!r})'.format(str(self))
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        return iter(str(self))
+
+    def __contains__(self, sub):
+        return str(sub) in str(self)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._length)
+            if step != 1:
+                return str(self)[key]
+            stop = max(start, stop)
+            in_range = (self._exception_positions >= start) & (self._exception_positions < stop)
+            return self._from_codes(self.codes(start, stop),
+                                    self.alphabet,
+                                    self._exception_positions[in_range] - start,
+                                    self._exception_characters[in_range])
+        if key < 0:
+            key += self._length
+        if not 0 <= key < self._length:
+            raise IndexError('PackedSequence index out of range')
+        match = np.flatnonzero(self._exception_positions == key)
+        if len(match) > 0:
+            return chr(self._exception_characters[match[0]])
+        return self.alphabet[self.codes(key, key + 1)[0]]
+
+    def __add__(self, other):
+        if isinstance(other, PackedSequence):
+            return PackedSequence.concatenate([self, other])
+        return str(self) + other
+
+    def __radd__(self, other):
+        return other + str(self)
+
+    def __eq__(self, other):
+        if isinstance(other, PackedSequence):
+            if self.alphabet == other.alphabet and self._length == other._length:
+                return (self._packed == other._packed and
+                        self._positions == other._positions and
+                        self._characters == other._characters)
+            return str(self) == str(other)
+        if isinstance(other, str):
+            return str(self) == other
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __hash__(self):
+        return hash(str(self))
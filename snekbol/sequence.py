@@ -1,22 +1,29 @@
+import sys
 from operator import attrgetter
 from lxml import etree as ET
 
 from rdflib import Namespace, URIRef, Literal, RDF
 
-from .identified import Identified
+from .identified import Identified, Indexed, ListAttribute
 from .types import *
 from .namespaces import SBOL, NS
 from .location import Range, Cut, GenericLocation
+from .packed import PackedSequence
+from .sequencestore import MappedSequence
 
-class Sequence(Identified):
+class Sequence(Indexed):
     """
     Represents the primary structure of a ComponentDefinition
     """
+    __slots__ = ('_encoding', 'elements')
+    _index_attributes = (('encoding', '_encoding'),)
+
     def __init__(self,
                  identity,
                  elements,
                  encoding='DNA',
                  fromURI=False,
+                 packed=False,
                  **kwargs):
         super().__init__(identity, **kwargs)
 
@@ -24,6 +31,8 @@ class Sequence(Identified):
 
         self.encoding = encoding
         self.elements = elements
+        if packed:
+            self.pack()
 
     def __str__(self):
         return 'Sequence: {}'.format(self.identity)
@@ -36,13 +45,58 @@ class Sequence(Identified):
     def encoding(self, value):
         self._encoding = checktype(value, ENCODING_URI)
 
+    @property
+    def is_packed(self):
+        return isinstance(self.elements, PackedSequence)
+
+    def pack(self):
+        """
+        Store nucleotide elements as a PackedSequence, other encodings are left as they are
+
+        Elements that would not be smaller packed (mostly non nucleotide characters) stay a str.
+        """
+        if self.encoding != ENCODING_URI['DNA'] or not isinstance(self.elements, str):
+            return
+        try:
+            packed = PackedSequence(self.elements)
+        except UnicodeEncodeError:
+            return
+        if packed.nbytes < sys.getsizeof(self.elements):
+            self.elements = packed
+
+    def unpack(self):
+        """
+        Store elements as a str
+        """
+        if self.is_packed:
+            self.elements = str(self.elements)
+
+    @property
+    def is_mapped(self):
+        return isinstance(self.elements, MappedSequence)
+
+    def spill(self, store):
+        """
+        Move elements into a MappedSequenceStore, leaving a MappedSequence view in their place
+        """
+        if self.is_mapped:
+            return
+        try:
+            self.elements = store.add(str(self.elements))
+        except UnicodeEncodeError:
+            return
+
     def _as_rdf_xml(self, ns):
         elements = super()._as_rdf_xml(ns)
         sequence = ET.Element(NS('sbol', 'Sequence'), attrib={NS('rdf', 'about'):
                                                               self.rdf_identity})
         sequence.extend(elements)
         element_elem = ET.Element(NS('sbol', 'elements'))
-        element_elem.text = self.elements
+        if self.is_mapped:
+            # Filled in from the mapping by Document.write
+            element_elem.text = self.elements.placeholder
+        else:
+            element_elem.text = str(self.elements)
         sequence.append(element_elem)
         sequence.append(ET.Element(NS('sbol', 'encoding'), attrib={NS('rdf', 'resource'):
                                                                    self.encoding}))
@@ -53,6 +107,13 @@ class SequenceAnnotation(Identified):
     """
     Describes one or more regions of interest on a Sequence object
     """
+    __slots__ = ('_locations', 'component', '_roles')
+    _reference_attributes = ('component',)
+    _index_attributes = (('role', '_roles'),)
+
+    locations = ListAttribute('_locations')
+    roles = ListAttribute('_roles')
+
     def __init__(self,
                  identity,
                  locations,
@@ -67,17 +128,11 @@ class SequenceAnnotation(Identified):
     @property
     def first_location(self):
         lowest_value = 0
-        for i, l in enumerate(self.locations):
-            if isinstance(l, Range):
-                if i == 0:
-                    lowest_value = int(l.start)
-                elif int(l.start) < lowest_value:
-                    lowest_value = int(l.start)
-            elif isinstance(l, Cut):
-                if i == 0:
-                    lowest_value = int(l.at)
-                elif int(l.at) < lowest_value:
-                    lowest_value = int(l.at)
+        for i, l in enumerate(self._locations):
+            if isinstance(l, (Range, Cut)):
+                position = l.position
+                if i == 0 or position < lowest_value:
+                    lowest_value = position
         return lowest_value
 
     def _as_rdf_xml(self, ns):
@@ -90,10 +145,10 @@ class SequenceAnnotation(Identified):
             ET.SubElement(sequence_annotation,
                           NS('sbol', 'component'), attrib={NS('rdf', 'resource'):
                                                            self.component._get_identity(ns)})
-        for r in self.roles:
+        for r in self._roles:
             ET.SubElement(sequence_annotation, NS('sbol', 'role'),
                           attrib={NS('rdf', 'resource'): r})
-        for l in self.locations:
+        for l in self._locations:
             location = ET.SubElement(sequence_annotation, NS('sbol', 'location'))
             location.append(l._as_rdf_xml(ns))
         return sap
@@ -103,6 +158,9 @@ class SequenceConstraint(Identified):
     """
     Assert restrictions on the relative, sequence-based positions of pairs of Component objects
     """
+    __slots__ = ('subject', 'obj', 'restriction')
+    _reference_attributes = ('subject', 'obj')
+
     def __init__(self,
                  identity,
                  subject,
@@ -0,0 +1,291 @@
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .types import ENCODING_URI
+from .packed import PackedSequence
+from .sequencestore import MappedSequence
+from .sequence import Sequence
+
+# IUPAC nucleotide codes and their complements in DNA and in RNA, where A pairs with U
+NUCLEOTIDE_CODES = 'ACGTUMRWSYKVHDBNacgtumrwsykvhdbn'
+COMPLEMENTS = str.maketrans(NUCLEOTIDE_CODES, 'TGCAAKYWSRMBDHVNtgcaakywsrmbdhvn')
+RNA_COMPLEMENTS = str.maketrans(NUCLEOTIDE_CODES, 'UGCAAKYWSRMBDHVNugcaakywsrmbdhvn')
+# Characters allowed by each encoding in either case, encodings not listed are not checked
+NUCLEOTIDE_ALPHABET = 'ACGTUMRWSYKVHDBN-.'
+PROTEIN_ALPHABET = 'ACDEFGHIKLMNPQRSTVWYBZXJUO*-.'
+ENCODING_ALPHABETS = {
+    ENCODING_URI['DNA']: NUCLEOTIDE_ALPHABET,
+    ENCODING_URI['Protein']: PROTEIN_ALPHABET,
+}
+# Standard genetic code, amino acids of the codons in TCAG order as in NCBI translation tables
+STANDARD_CODE = 'FFLLSSSSYY**CC*WLLLLPPPPHHQQRRRRIIIMTTTTNNKKSSRRVVVVAAAADDEEGGGG'
+# Bases counted by gc_content, S stands for either
+GC_BASES = 'GCS'
+
+if np is not None:
+    _COMPLEMENT_TABLE = np.arange(256, dtype=np.uint8)
+    _RNA_COMPLEMENT_TABLE = np.arange(256, dtype=np.uint8)
+    for _table, _complements in ((_COMPLEMENT_TABLE, COMPLEMENTS),
+                                 (_RNA_COMPLEMENT_TABLE, RNA_COMPLEMENTS)):
+        for _base in NUCLEOTIDE_CODES:
+            _table[ord(_base)] = _complements[ord(_base)]
+    # 2-bit code of each base as in PackedSequence, 255 for anything else
+    _BASE_CODES = np.full(256, 255, dtype=np.uint8)
+    for _code, _bases in enumerate(('Aa', 'Cc', 'Gg', 'TtUu')):
+        for _base in _bases:
+            _BASE_CODES[ord(_base)] = _code
+
+
+def _require_numpy():
+    if np is None:
+        raise ImportError('NumPy is required for vectorised sequence operations')
+
+
+def _elements(elements):
+    return elements.elements if isinstance(elements, Sequence) else elements
+
+
+def _character_table(characters):
+    table = np.zeros(256, dtype=bool)
+    for character in characters:
+        table[ord(character.upper())] = True
+        table[ord(character.lower())] = True
+    return table
+
+
+def as_array(elements):
+    """
+    NumPy uint8 array of the ASCII characters of a Sequence, its elements or such an array
+
+    Characters that are not ASCII become '?'.
+    """
+    _require_numpy()
+    elements = _elements(elements)
+    if isinstance(elements, np.ndarray):
+        return elements.astype(np.uint8, copy=False)
+    if isinstance(elements, PackedSequence):
+        data = elements.to_bytes()
+    elif isinstance(elements, MappedSequence):
+        data = b''.join(elements.iter_bytes())
+    else:
+        data = str(elements).encode('ascii', 'replace')
+    return np.frombuffer(data, dtype=np.uint8)
+
+
+def _join(sequences):
+    """
+    (identities, one array of all their elements, offset of each and the end)
+    """
+    sequences = list(sequences)
+    arrays = [as_array(s) for s in sequences]
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    np.cumsum([len(a) for a in arrays], out=offsets[1:])
+    joined = np.concatenate(arrays) if len(arrays) > 0 else np.zeros(0, dtype=np.uint8)
+    return [s.identity for s in sequences], joined, offsets
+
+
+def _split(data, identities, offsets):
+    return {identity: data[start:end].tobytes().decode('ascii')
+            for identity, start, end in zip(identities, offsets[:-1], offsets[1:])}
+
+
+def _is_rna(elements):
+    """
+    Whether A pairs with U, as it does in elements with a U and no T or a packed RNA alphabet
+    """
+    if isinstance(elements, PackedSequence):
+        return elements.alphabet[3] in 'uU'
+    if np is not None and isinstance(elements, np.ndarray):
+        counts = np.bincount(as_array(elements), minlength=256)
+        elements = ''.join(base for base in 'TtUu' if counts[ord(base)])
+    return ('U' in elements or 'u' in elements) and not ('T' in elements or 't' in elements)
+
+
+def reverse_complement(elements):
+    """
+    Reverse complement of a nucleotide sequence, characters other than IUPAC codes are kept
+
+    A Sequence or str gives a str, a PackedSequence stays packed and an array stays an array.
+    RNA, with a U and no T, is complemented with A paired to U.
+    """
+    elements = _elements(elements)
+    if isinstance(elements, PackedSequence):
+        table = _RNA_COMPLEMENT_TABLE if _is_rna(elements) else _COMPLEMENT_TABLE
+        codes = 3 - elements.codes()[::-1]
+        positions = len(elements) - 1 - elements._exception_positions[::-1]
+        characters = table[elements._exception_characters[::-1]]
+        return PackedSequence._from_codes(codes, elements.alphabet, positions, characters)
+    if np is not None and isinstance(elements, np.ndarray):
+        table = _RNA_COMPLEMENT_TABLE if _is_rna(elements) else _COMPLEMENT_TABLE
+        return table[as_array(elements)[::-1]]
+    elements = str(elements)
+    return elements.translate(RNA_COMPLEMENTS if _is_rna(elements) else COMPLEMENTS)[::-1]
+
+
+def reverse_complements(sequences):
+    """
+    Reverse complement of each of sequences by identity, see reverse_complement
+    """
+    groups = ([], [])
+    for sequence in sequences:
+        elements = str(_elements(sequence))
+        groups[_is_rna(elements)].append((sequence.identity, elements))
+    complements = {}
+    for group, table in zip(groups, (COMPLEMENTS, RNA_COMPLEMENTS)):
+        # The reverse complement of the joined elements holds every one of them in reverse order
+        joined = ''.join(elements for _, elements in group).translate(table)[::-1]
+        end = len(joined)
+        for identity, elements in group:
+            start = end - len(elements)
+            complements[identity] = joined[start:end]
+            end = start
+    return complements
+
+
+def gc_content(elements):
+    """
+    Fraction of the characters of a nucleotide sequence that are G, C or S, 0.0 if it is empty
+    """
+    elements = _elements(elements)
+    if len(elements) == 0:
+        return 0.0
+    if isinstance(elements, PackedSequence):
+        counts = elements.counts()
+        gc = sum(counts.get(b, 0) + counts.get(b.lower(), 0) for b in GC_BASES)
+    elif np is not None and isinstance(elements, np.ndarray):
+        gc = int(np.count_nonzero(_character_table(GC_BASES)[as_array(elements)]))
+    else:
+        text = str(elements)
+        gc = sum(text.count(b) + text.count(b.lower()) for b in GC_BASES)
+    return gc / len(elements)
+
+
+def gc_contents(sequences):
+    """
+    GC content of each of sequences by identity, worked out in one pass over all of them
+    """
+    identities, joined, offsets = _join(sequences)
+    totals = np.zeros(len(joined) + 1, dtype=np.int64)
+    np.cumsum(_character_table(GC_BASES)[joined], out=totals[1:])
+    gc = totals[offsets[1:]] - totals[offsets[:-1]]
+    lengths = np.diff(offsets)
+    fractions = gc / np.maximum(lengths, 1)
+    return {identity: float(f) for identity, f in zip(identities, fractions)}
+
+
+def windowed_content(elements, size, step=1, characters=GC_BASES):
+    """
+    NumPy array of the fraction of each window of size characters that are one of characters
+
+    Windows start every step characters and only whole windows are included, so the default
+    gives the GC content along the sequence.
+    """
+    if size < 1 or step < 1:
+        raise ValueError('Window size and step must be at least 1')
+    data = as_array(elements)
+    totals = np.zeros(len(data) + 1, dtype=np.int64)
+    np.cumsum(_character_table(characters)[data], out=totals[1:])
+    starts = np.arange(0, len(data) - size + 1, step)
+    return (totals[starts + size] - totals[starts]) / size
+
+
+def _alphabet(encoding):
+    encoding = ENCODING_URI.get(encoding, encoding)
+    return ENCODING_ALPHABETS.get(str(encoding))
+
+
+def invalid_positions(elements, encoding=None):
+    """
+    0-based positions of the characters not allowed by encoding, a short name or URI
+
+    The encoding of a Sequence is used if none is given, otherwise DNA. Encodings other than
+    nucleotides and proteins, such as SMILES, are not checked.
+    """
+    if encoding is None:
+        encoding = elements.encoding if isinstance(elements, Sequence) else 'DNA'
+    alphabet = _alphabet(encoding)
+    if alphabet is None:
+        return []
+    return np.flatnonzero(~_character_table(alphabet)[as_array(elements)]).tolist()
+
+
+def invalid_sequences(sequences):
+    """
+    Positions not allowed by its encoding in each of sequences that has any, by identity
+
+    Sequences with the same encoding are checked together in one pass.
+    """
+    by_alphabet = {}
+    for sequence in sequences:
+        alphabet = _alphabet(sequence.encoding)
+        if alphabet is not None:
+            by_alphabet.setdefault(alphabet, []).append(sequence)
+
+    invalid = {}
+    for alphabet, group in by_alphabet.items():
+        identities, joined, offsets = _join(group)
+        positions = np.flatnonzero(~_character_table(alphabet)[joined])
+        owners = np.searchsorted(offsets, positions, side='right') - 1
+        for owner in np.unique(owners):
+            found = positions[owners == owner] - offsets[owner]
+            invalid[identities[owner]] = found.tolist()
+    return invalid
+
+
+def _codon_table(table):
+    """
+    Amino acid of each codon by 16 * first + 4 * second + third 2-bit code, as ASCII
+    """
+    if len(table) != 64:
+        raise ValueError('A translation table has 64 amino acids, one for each codon')
+    # Codons with anything but A, C, G, T or U are looked up at 64
+    amino_acids = np.full(65, ord('X'), dtype=np.uint8)
+    for i, amino_acid in enumerate(table):
+        bases = ('TCAG'[i // 16], 'TCAG'[i // 4 % 4], 'TCAG'[i % 4])
+        code = 16 * 'ACGT'.index(bases[0]) + 4 * 'ACGT'.index(bases[1]) + 'ACGT'.index(bases[2])
+        amino_acids[code] = ord(amino_acid)
+    return amino_acids
+
+
+def _translate_codons(data, starts, amino_acids):
+    codes = _BASE_CODES[data]
+    first, second, third = codes[starts], codes[starts + 1], codes[starts + 2]
+    # Base codes are 0 to 3, so any code of 255 shows in the bitwise or
+    indices = np.where((first | second | third) > 3, 64,
+                       (first << 4) | (second << 2) | third)
+    return amino_acids[indices]
+
+
+def translate(elements, table=STANDARD_CODE, frame=0, to_stop=False):
+    """
+    Protein sequence coded for by a nucleotide sequence, starting frame bases in
+
+    Codons are looked up in table, 64 amino acids in TCAG order, and any with an ambiguous base
+    becomes X. A trailing partial codon is left out, to_stop ends the protein before the first
+    stop codon.
+    """
+    data = as_array(elements)[frame:]
+    starts = np.arange(0, len(data) - 2, 3)
+    protein = _translate_codons(data, starts, _codon_table(table)).tobytes().decode('ascii')
+    return protein.split('*', 1)[0] if to_stop else protein
+
+
+def translations(sequences, table=STANDARD_CODE, frame=0, to_stop=False):
+    """
+    Translation of each of sequences by identity, see translate, all codons looked up at once
+    """
+    identities, joined, offsets = _join(sequences)
+    lengths = np.maximum(np.diff(offsets) - frame, 0)
+    counts = lengths // 3
+    protein_offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=protein_offsets[1:])
+    # Start of every codon, numbered from the start of its own sequence
+    numbers = np.arange(protein_offsets[-1]) - np.repeat(protein_offsets[:-1], counts)
+    starts = np.repeat(offsets[:-1] + frame, counts) + 3 * numbers
+    proteins = _split(_translate_codons(joined, starts, _codon_table(table)), identities,
+                      protein_offsets)
+    if to_stop:
+        proteins = {identity: p.split('*', 1)[0] for identity, p in proteins.items()}
+    return proteins
@@ -0,0 +1,154 @@
+import mmap
+import os
+import re
+import tempfile
+from xml.sax.saxutils import escape
+
+CHUNK_SIZE = 1 << 20
+
+# Written in place of mapped elements while a document is serialised, see Document.write
+PLACEHOLDER_PATTERN = re.compile(b'mapped:\\d+:\\d+:\\d+')
+
+
+class MappedSequenceStore(object):
+    """
+    Append only side file holding sequence elements outside the Python heap
+
+    Elements of threshold characters or more are written to the file and read back through a
+    memory map. Without a path a temporary file is used and removed when the store is closed.
+    """
+    def __init__(self, path=None, threshold=1 << 20):
+        self.threshold = threshold
+        if path is None:
+            handle, path = tempfile.mkstemp(suffix='.sequences')
+            os.close(handle)
+            self._temporary = True
+        else:
+            self._temporary = False
+        self.path = path
+        self._file = open(path, 'w+b')
+        self._size = 0
+        self._mmap = None
+
+    def add(self, elements):
+        """
+        Write elements (a str or an iterable of str parts) and return a MappedSequence view
+        """
+        if isinstance(elements, str):
+            elements = [elements]
+        offset = self._size
+        self._file.seek(offset)
+        for part in elements:
+            if isinstance(part, MappedSequence):
+                for chunk in part.iter_bytes():
+                    self._file.write(chunk)
+            else:
+                self._file.write(str(part).encode('ascii'))
+        self._file.flush()
+        self._size = self._file.tell()
+        return MappedSequence(self, offset, self._size - offset)
+
+    def read(self, offset, length):
+        if length == 0:
+            return b''
+        if self._mmap is None or len(self._mmap) < offset + length:
+            if self._mmap is not None:
+                self._mmap.close()
+            self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap[offset:offset + length]
+
+    def close(self):
+        if self._mmap is not None:
+            self._mmap.close()
+            self._mmap = None
+        self._file.close()
+        if self._temporary:
+            os.remove(self.path)
+
+
+class MappedSequence(object):
+    """
+    Read only str-like view of sequence elements held in a MappedSequenceStore
+
+    Pickling a view stores the elements as a plain str.
+    """
+    __slots__ = ('_store', '_offset', '_length')
+
+    def __init__(self, store, offset, length):
+        self._store = store
+        self._offset = offset
+        self._length = length
+
+    def iter_bytes(self, chunk_size=CHUNK_SIZE):
+        for start in range(0, self._length, chunk_size):
+            yield self._store.read(self._offset + start, min(chunk_size, self._length - start))
+
+    def iter_chunks(self, chunk_size=CHUNK_SIZE):
+        for chunk in self.iter_bytes(chunk_size):
+            yield chunk.decode('ascii')
+
+    def write_xml_text(self, f):
+        """
+        Write the elements to a binary file as escaped XML text, one chunk at a time
+        """
+        for chunk in self.iter_chunks():
+            f.write(escape(chunk).encode('ascii'))
+
+    @property
+    def placeholder(self):
+        return 'mapped:{}:{}:{}'.format(id(self._store), self._offset, self._length)
+
+    def count(self, sub):
+        if len(sub) == 1:
+            return sum(chunk.count(sub) for chunk in self.iter_chunks())
+        return str(self).count(sub)
+
+    def __str__(self):
+        return self._store.read(self._offset, self._length).decode('ascii')
+
+    def __repr__(self):
+        return 'MappedSequence({}, offset={}, length={})'.format(self._store.path, self._offset,
+                                                                 self._length)
+
+    def __reduce__(self):
+        return (str, (str(self),))
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for chunk in self.iter_chunks():
+            yield from chunk
+
+    def __contains__(self, sub):
+        return str(sub) in str(self)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(self._length)
+            if step != 1:
+                return str(self)[key]
+            return self._store.read(self._offset + start, max(0, stop - start)).decode('ascii')
+        if key < 0:
+            key += self._length
+        if not 0 <= key < self._length:
+            raise IndexError('MappedSequence index out of range')
+        return self._store.read(self._offset + key, 1).decode('ascii')
+
+    def __add__(self, other):
+        return str(self) + str(other)
+
+    def __radd__(self, other):
+        return str(other) + str(self)
+
+    def __eq__(self, other):
+        if isinstance(other, (str, MappedSequence)) or hasattr(other, 'to_bytes'):
+            return len(self) == len(other) and str(self) == str(other)
+        return NotImplemented
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        return result if result is NotImplemented else not result
+
+    def __hash__(self):
+        return hash(str(self))
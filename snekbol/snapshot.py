@@ -0,0 +1,79 @@
+import hashlib
+import os
+import pickle
+import tempfile
+
+from . import __version__
+
+# Bump when the layout of the pickled state changes
+SNAPSHOT_FORMAT = 8
+
+CHUNK_SIZE = 1 << 20
+
+
+def snapshot_key(f):
+    """
+    Hash the name and content of an SBOL file, leaving a file object rewound for reading
+
+    The name is part of the key as relative URIs in a file are resolved against it.
+    """
+    digest = hashlib.sha256()
+    if isinstance(f, str):
+        digest.update(f.encode('utf-8'))
+        with open(f, 'rb') as source:
+            _hash_file(digest, source)
+        return digest.hexdigest()
+
+    name = getattr(f, 'name', None)
+    if isinstance(name, str):
+        digest.update(name.encode('utf-8'))
+    source = getattr(f, 'buffer', f)
+    start = source.tell()
+    _hash_file(digest, source)
+    source.seek(start)
+    if source is not f:
+        f.seek(start)
+    return digest.hexdigest()
+
+
+def _hash_file(digest, source):
+    chunk = source.read(CHUNK_SIZE)
+    while chunk:
+        # Text streams without an underlying binary buffer, such as io.StringIO, give str
+        digest.update(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        chunk = source.read(CHUNK_SIZE)
+
+
+def snapshot_path(cache_dir, key):
+    return os.path.join(cache_dir, '{}.snapshot'.format(key))
+
+
+def load_snapshot(path):
+    """
+    Load the state stored at path, None if it is missing or was written by another version
+    """
+    try:
+        with open(path, 'rb') as f:
+            header = pickle.load(f)
+            if header != (SNAPSHOT_FORMAT, __version__):
+                return None
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError):
+        return None
+
+
+def save_snapshot(path, state):
+    """
+    Write state to path, replacing any existing snapshot atomically
+    """
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    handle, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as f:
+            pickle.dump((SNAPSHOT_FORMAT, __version__), f, pickle.HIGHEST_PROTOCOL)
+            pickle.dump(state, f, pickle.HIGHEST_PROTOCOL)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
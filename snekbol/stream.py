@@ -0,0 +1,191 @@
+from urllib.parse import urljoin
+
+from lxml import etree as ET
+
+from rdflib import Graph, BNode, URIRef, Literal, RDF
+
+from .namespaces import SBOL
+from .subjectindex import SubjectIndex
+
+RDF_NS = str(RDF)
+XML_NAMESPACE = 'http://www.w3.org/XML/1998/namespace'
+
+RDF_DESCRIPTION = '{' + RDF_NS + '}Description'
+RDF_ABOUT = '{' + RDF_NS + '}about'
+RDF_ID = '{' + RDF_NS + '}ID'
+RDF_NODE_ID = '{' + RDF_NS + '}nodeID'
+RDF_RESOURCE = '{' + RDF_NS + '}resource'
+RDF_DATATYPE = '{' + RDF_NS + '}datatype'
+RDF_PARSE_TYPE = '{' + RDF_NS + '}parseType'
+RDF_TYPE = '{' + RDF_NS + '}type'
+XML_BASE = '{' + XML_NAMESPACE + '}base'
+XML_LANG = '{' + XML_NAMESPACE + '}lang'
+
+
+def _tag_uri(tag):
+    """
+    Turn an lxml {namespace}local tag into a URIRef
+    """
+    namespace, _, local_name = tag[1:].partition('}')
+    return URIRef(namespace + local_name)
+
+
+class ForwardReferences(object):
+    """
+    Bounded table of references to objects that have not been read yet
+    """
+    def __init__(self, limit):
+        self.limit = limit
+        self._pending = {}
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def add(self, store, uri, assign, optional=False):
+        if self._count >= self.limit:
+            raise Exception('More than {} unresolved references while reading'.format(self.limit))
+        self._pending.setdefault(uri, []).append((store, assign, optional))
+        self._count += 1
+
+    def resolve(self, uri):
+        waiting = self._pending.pop(uri, None)
+        if waiting is None:
+            return
+        remaining = []
+        for store, assign, optional in waiting:
+            if uri in store:
+                assign(store[uri])
+                self._count -= 1
+            else:
+                remaining.append((store, assign, optional))
+        if len(remaining) > 0:
+            self._pending[uri] = remaining
+
+    def check(self):
+        """
+        Raise a KeyError for the first reference that was never resolved and is not optional
+        """
+        for uri, waiting in self._pending.items():
+            if any(not optional for store, assign, optional in waiting):
+                raise KeyError(uri)
+
+
+class StreamReader(object):
+    """
+    Read SBOL RDF/XML in a single pass, building document objects one TopLevel element at a time
+
+    Each child of rdf:RDF is turned into a SubjectIndex holding only its own triples, handed to
+    the document builders and then discarded so memory does not grow with the size of the file.
+    """
+    def __init__(self, document):
+        self.document = document
+        self._bnodes = {}
+
+    def read(self, f):
+        source = getattr(f, 'buffer', f)
+        # rdflib resolves relative URIs against the file name, do the same
+        file_base = getattr(f, 'name', f)
+        file_base = file_base if isinstance(file_base, str) else None
+        root = None
+        for event, item in ET.iterparse(source, events=('start', 'end', 'start-ns'),
+                                        huge_tree=True):
+            if event == 'start-ns':
+                self.document._add_read_namespace(item[0], item[1])
+            elif event == 'start':
+                if root is None:
+                    root = item
+                    self._add_default_namespaces()
+            elif item.getparent() is root:
+                if isinstance(item.tag, str):
+                    self._read_top_level(item, root.get(XML_BASE, file_base))
+                # Drop the finished element and anything before it
+                item.clear()
+                while item.getprevious() is not None:
+                    del root[0]
+
+    def _add_default_namespaces(self):
+        # Match the prefixes an rdflib Graph binds before parsing
+        for prefix, namespace in Graph().namespaces():
+            if prefix not in self.document._namespaces:
+                self.document._add_read_namespace(prefix, namespace.toPython())
+
+    def _read_top_level(self, elem, base):
+        index = SubjectIndex()
+        identity = self._node_element(elem, index, base)
+        types = set(index.objects(identity, RDF.type))
+        document = self.document
+
+        if SBOL.Sequence in types:
+            document._read_sequence(index, identity)
+        if SBOL.ComponentDefinition in types:
+            definition = document._read_component_definition(index, identity)
+            if definition is not None:
+                document._extend_component_definitions(index, [definition])
+        if SBOL.Model in types:
+            document._read_model(index, identity)
+        if SBOL.ModuleDefinition in types:
+            module_definition = document._read_module_definition(index, identity)
+            if module_definition is not None:
+                document._extend_module_definition(index, identity, module_definition)
+        document._read_annotations(index)
+        if SBOL.Collection in types:
+            document._read_collection(index, identity)
+
+    def _resolve(self, base, uri):
+        # Only relative URIs (no scheme before the first slash) need joining to the base
+        if base and ':' not in uri.split('/', 1)[0]:
+            return URIRef(urljoin(base, uri))
+        return URIRef(uri)
+
+    def _subject(self, elem, base):
+        about = elem.get(RDF_ABOUT)
+        if about is not None:
+            return self._resolve(base, about)
+        node_id = elem.get(RDF_NODE_ID)
+        if node_id is not None:
+            return self._bnodes.setdefault(node_id, BNode())
+        element_id = elem.get(RDF_ID)
+        if element_id is not None:
+            return URIRef('{}#{}'.format(base or '', element_id))
+        return BNode()
+
+    def _node_element(self, elem, index, base):
+        """
+        Add the triples for an RDF/XML node element and return its subject
+        """
+        base = elem.get(XML_BASE, base)
+        subject = self._subject(elem, base)
+        if elem.tag != RDF_DESCRIPTION:
+            index.add((subject, RDF.type, _tag_uri(elem.tag)))
+        for attr, value in elem.attrib.items():
+            if attr == RDF_TYPE:
+                index.add((subject, RDF.type, self._resolve(base, value)))
+            elif not attr.startswith(('{' + RDF_NS, '{' + XML_NAMESPACE)):
+                index.add((subject, _tag_uri(attr), Literal(value)))
+        for child in elem:
+            if isinstance(child.tag, str):
+                self._property_element(subject, child, index, base)
+        return subject
+
+    def _property_element(self, subject, elem, index, base):
+        base = elem.get(XML_BASE, base)
+        resource = elem.get(RDF_RESOURCE)
+        node_id = elem.get(RDF_NODE_ID)
+        children = [c for c in elem if isinstance(c.tag, str)]
+        if resource is not None:
+            obj = self._resolve(base, resource)
+        elif node_id is not None:
+            obj = self._bnodes.setdefault(node_id, BNode())
+        elif elem.get(RDF_PARSE_TYPE) == 'Resource':
+            obj = BNode()
+            for child in children:
+                self._property_element(obj, child, index, base)
+        elif len(children) > 0:
+            obj = self._node_element(children[0], index, base)
+        else:
+            datatype = elem.get(RDF_DATATYPE)
+            obj = Literal(elem.text or '',
+                          lang=elem.get(XML_LANG),
+                          datatype=URIRef(datatype) if datatype is not None else None)
+        index.add((subject, _tag_uri(elem.tag), obj))
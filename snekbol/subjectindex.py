@@ -0,0 +1,69 @@
+from rdflib import RDF
+
+
+class SubjectIndex(object):
+    """
+    Dictionary backed triple store providing the parts of the rdflib Graph API used when reading
+    """
+    def __init__(self):
+        # subject -> predicate -> objects, dicts are used as ordered sets
+        self._subjects = {}
+        self._types = {}
+
+    @classmethod
+    def from_graph(cls, graph):
+        """
+        Index every triple of an rdflib Graph in a single sweep
+        """
+        index = cls()
+        add = index.add
+        for triple in graph:
+            add(triple)
+        return index
+
+    def add(self, triple):
+        subject, predicate, obj = triple
+        self._subjects.setdefault(subject, {}).setdefault(predicate, {})[obj] = None
+        if predicate == RDF.type:
+            self._types.setdefault(obj, {})[subject] = None
+
+    def value(self, subject=None, predicate=None):
+        for obj in self._subjects.get(subject, {}).get(predicate, ()):
+            return obj
+        return None
+
+    def properties(self, subject):
+        """
+        All predicates of subject mapped to their objects
+        """
+        return self._subjects.get(subject, {})
+
+    def objects(self, subject, predicate):
+        return iter(self._subjects.get(subject, {}).get(predicate, ()))
+
+    def triples(self, pattern):
+        subject, predicate, obj = pattern
+        if subject is None and predicate == RDF.type and obj is not None:
+            for s in self._types.get(obj, ()):
+                yield (s, predicate, obj)
+            return
+        subjects = self._subjects if subject is None else (subject,)
+        for s in subjects:
+            properties = self._subjects.get(s, {})
+            if predicate is None:
+                matches = properties.items()
+            else:
+                matches = ((predicate, properties.get(predicate, ())),)
+            for p, objects in matches:
+                for o in objects:
+                    if obj is None or o == obj:
+                        yield (s, p, o)
+
+    def __contains__(self, pattern):
+        for _ in self.triples(pattern):
+            return True
+        return False
+
+    def __len__(self):
+        return sum(len(objects) for properties in self._subjects.values()
+                   for objects in properties.values())
@@ -1,9 +1,25 @@
+import io
 import os
+import pickle
+import tempfile
 import unittest
 
+from lxml import etree as ET
+from rdflib import Graph, URIRef, RDF
+
 from snekbol.document import Document
+from snekbol.namespaces import SBOL, XML_NS, NS, NamespaceResolver
+from snekbol.subjectindex import SubjectIndex
+from snekbol.uritable import URITable
+from snekbol import snapshot
 from snekbol.componentdefinition import ComponentDefinition
+from snekbol.components import Component, FunctionalComponent
+from snekbol.model import ModuleDefinition, Module, Interaction, Participation
+from snekbol.collection import Collection
+from snekbol.annotation import AnnotationValue
 from snekbol.sequence import *
+from snekbol.packed import PackedSequence
+from snekbol.contentstore import content_digest
 
 class DocumentTestCase(unittest.TestCase):
 
@@ -41,9 +57,634 @@ class DocumentTestCase(unittest.TestCase):
         self.assertTrue(len(self.document._components) == 5)
         self.assertTrue(len(self.document._sequences) == 5)
 
+    def test_get_components(self):
+        gene = ComponentDefinition("BB0001")
+        parts = [ComponentDefinition(identity, sequences=[Sequence(identity + "_seq", elements)])
+                 for identity, elements in [("R0010", "ggctgca"), ("B0032", "aattatataaa"),
+                                            ("E0040", "atgtaa")]]
+        for definition in [gene] + parts:
+            self.document.add_component_definition(definition)
+        self.document.assemble_component(gene, parts)
+
+        components = self.document.get_components("BB0001")
+        self.assertEqual([c.definition for c in components], parts)
+        self.assertFalse(self.document.get_components("missing"))
+
+        # Moving the first annotation to the end changes the order
+        first = min(gene.sequence_annotations, key=lambda a: a.first_location)
+        first.locations[0].start = '100'
+        self.assertEqual(first.locations[0].position, 100)
+        self.assertEqual(self.document.get_components("BB0001")[-1], first.component)
+        gene.sequence_annotations.remove(first)
+        orderings = self.document.get_components_many(["BB0001", "R0010", "missing"])
+        self.assertEqual([c.definition for c in orderings["BB0001"]], parts[1:])
+        self.assertEqual(orderings["R0010"], [])
+        self.assertFalse(orderings["missing"])
+
+    def test_duplicate_sequences(self):
+        parts = [ComponentDefinition(identity, sequences=[Sequence(identity + "_seq", elements)])
+                 for identity, elements in [("R0010", "ggctgca"), ("R0011", "ggctgca"),
+                                            ("E0040", "atgtaa")]]
+        for definition in parts:
+            self.document.add_component_definition(definition)
+        genes = list(self.document.assemble_combinations([parts[:2], parts[2:]], 'BB', add=True))
+
+        self.assertIs(parts[0].sequences[0].elements, parts[1].sequences[0].elements)
+        self.assertIs(genes[0].sequences[0].elements, genes[1].sequences[0].elements)
+        self.assertEqual(self.document.duplicate_sequences(),
+                         [["BB_1_sequence", "BB_2_sequence"], ["R0010_seq", "R0011_seq"]])
+        parts[2].sequences[0].elements = "ggctgca"
+        self.assertEqual(self.document.duplicate_sequences()[-1],
+                         ["E0040_seq", "R0010_seq", "R0011_seq"])
+        self.assertEqual(content_digest(PackedSequence("ggctgca")), content_digest("ggc", "tgca"))
+
+        written = io.BytesIO()
+        self.document.write(written)
+        for engine in ['rdflib', 'stream']:
+            doc = Document('http://example.org/sbol/', pack_sequences=True)
+            doc.read(io.BytesIO(written.getvalue()), engine=engine)
+            duplicates = doc.duplicate_sequences()
+            self.assertEqual([len(group) for group in duplicates], [2, 3])
+            self.assertEqual(len({id(s.elements) for s in doc.list_sequences()}), 2)
+
+    def test_sequence_contents_released(self):
+        uri = 'http://example.org/sbol/'
+        self.document._add_sequence(Sequence('R0010_seq', 'ggctgca'))
+        other = Document(uri)
+        for identity, elements in [('R0011_seq', 'ggctgca'), ('E0040_seq', 'atgtaa')]:
+            other._add_sequence(Sequence(identity, elements))
+        written = io.BytesIO()
+        other.write(written)
+        sequences = self.document._sequences
+        contents = self.document._contents
+        for engine in ['rdflib', 'stream']:
+            self.document.append(io.BytesIO(written.getvalue()), engine=engine,
+                                 on_conflict='replace')
+            self.assertIs(sequences['R0010_seq'].elements, sequences[uri + 'R0011_seq'].elements)
+            self.assertEqual(len(contents), 2)
+
+        self.document.remove_sequence(uri + 'E0040_seq')
+        self.assertIsNone(contents.get(content_digest('atgtaa')))
+        sequences['R0010_seq'].elements = 'atgtaa'
+        self.assertEqual(self.document.duplicate_sequences(), [])
+        self.document.remove_sequence(uri + 'R0011_seq')
+        self.assertIsNone(contents.get(content_digest('ggctgca')))
+        self.assertEqual(len(contents), 1)
+
+    def test_assemble_combinations(self):
+        promoters = [ComponentDefinition(identity, sequences=[Sequence(identity + "_seq", e)])
+                     for identity, e in [("R0010", "ggctgca"), ("R0011", "ttgaca")]]
+        cds = [ComponentDefinition(identity, sequences=[Sequence(identity + "_seq", e)])
+               for identity, e in [("E0040", "atgtaa"), ("E0030", "atgcgttaa")]]
+        for definition in promoters + cds:
+            self.document.add_component_definition(definition)
+
+        with self.assertRaises(Exception):
+            self.document.assemble_combinations([promoters, []])
+        with self.assertRaises(Exception):
+            self.document.assemble_combinations([[ComponentDefinition("B0034")]])
+        designs = self.document.assemble_combinations([promoters, cds])
+        self.assertEqual(len(self.document._sequences), 4)
+        designs = list(designs)
+        self.assertEqual([d.identity for d in designs],
+                         ['design_1', 'design_2', 'design_3', 'design_4'])
+        self.assertEqual(designs[3].sequences[0].elements, 'ttgacaatgcgttaa')
+        self.assertEqual([c.definition for c in designs[3].components], [promoters[1], cds[1]])
+        ranges = [a.locations[0] for a in designs[3].sequence_annotations]
+        self.assertEqual([(r.start, r.end) for r in ranges], [(1, 7), (7, 16)])
+        self.assertEqual(len(self.document._sequences), 4)
+        self.assertIsNone(self.document.get_component_definition('design_1'))
+
+        for design in self.document.assemble_combinations([promoters, cds], 'added', add=True):
+            self.assertIs(self.document.find(design.identity)[0], design)
+        self.assertEqual(len(self.document._components), 8)
+
+        output = io.BytesIO()
+        self.document.write_combinations(output, [promoters, cds[:1]], 'streamed')
+        output.seek(0)
+        doc = Document('http://example.org/sbol/')
+        doc.read(output)
+        self.assertEqual(len(doc._components), 10)
+        self.assertEqual(doc._sequences['http://example.org/sbol/streamed_2_sequence'].elements,
+                         'ttgacaatgtaa')
+
+    def test_assemble_packed(self):
+        doc = Document('http://example.org/sbol/', pack_sequences=True)
+        domains = [ComponentDefinition(identity, sequences=[Sequence(identity + "_seq", e,
+                                                                     encoding='Protein')])
+                   for identity, e in [("D1", "MKVLA"), ("D2", "WYHEQ")]]
+        parts = [ComponentDefinition(identity, sequences=[Sequence(identity + "_seq", e)])
+                 for identity, e in [("R0010", "ggctgca"), ("E0040", "atgtaa")]]
+        for definition in domains + parts:
+            doc.add_component_definition(definition)
+        protein, dna = [list(doc.assemble_combinations([[c] for c in slots], identity))[0]
+                        for slots, identity in [(domains, 'protein'), (parts, 'dna')]]
+
+        self.assertEqual(protein.sequences[0].elements, 'MKVLAWYHEQ')
+        self.assertIsInstance(protein.sequences[0].elements, str)
+        self.assertEqual(protein.sequences[0].encoding, domains[0].sequences[0].encoding)
+        self.assertIsInstance(dna.sequences[0].elements, PackedSequence)
+        self.assertEqual(str(dna.sequences[0].elements), 'ggctgcaatgtaa')
+
+    def test_find(self):
+        for lazy in [False, True]:
+            doc = Document('http://example.org/sbol/')
+            doc.read('./snekbol/tests/valid/toggle.xml', lazy=lazy)
+            uri = 'http://www.virtualparts.org/part/pIKE_Toggle_1'
+            location, parents = doc.find(URIRef(uri + '/anno1/location1'))
+            self.assertIsInstance(location, Range)
+            self.assertEqual([p.identity for p in parents], [uri + '/anno1', uri])
+            self.assertEqual(doc.find(uri), (doc.get_component_definition(uri), []))
+            self.assertIsNone(doc.find(uri + '/missing'))
+
+        definition = doc.get_component_definition(uri)
+        annotation = SequenceAnnotation(uri + '/anno9', locations=[Cut(uri + '/anno9/cut', '5')])
+        definition.sequence_annotations.append(annotation)
+        self.assertEqual(doc.find(uri + '/anno9/cut')[1], [annotation, definition])
+        definition.sequence_annotations.remove(annotation)
+        self.assertIsNone(doc.find(uri + '/anno9/cut'))
+        doc.remove_component_definition(uri)
+        self.assertIsNone(doc.find(uri + '/anno1/location1'))
+
+        # Renamed sequences and top level objects are found by their new identity only
+        sequence = Sequence('s1', 'acgt')
+        doc._add_sequence(sequence)
+        self.assertEqual(doc.find('s1'), (sequence, []))
+        sequence.identity = 's2'
+        self.assertEqual(doc.find('s2'), (sequence, []))
+        self.assertIsNone(doc.find('s1'))
+        definition = next(iter(doc.list_components()))
+        old_identity = definition.identity
+        definition.identity = old_identity + '_renamed'
+        self.assertIsNone(doc.find(old_identity))
+        self.assertEqual(doc.find(old_identity + '_renamed'), (definition, []))
+
+    def test_referrers(self):
+        gene = ComponentDefinition("BB0001")
+        device = ComponentDefinition("BB0002")
+        parts = [ComponentDefinition(identity, sequences=[Sequence(identity + "_seq", elements)])
+                 for identity, elements in [("R0010", "ggctgca"), ("B0032", "aattatataaa")]]
+        for definition in [gene, device] + parts:
+            self.document.add_component_definition(definition)
+        self.document.assemble_component(gene, parts)
+        device.components = [Component("BB0002/BB0001", gene, 'public')]
+
+        self.assertEqual(self.document.referrers("R0010"), [gene.components[0]])
+        self.assertEqual(self.document.dependents("R0010"), [gene, device])
+        self.assertEqual(self.document.dependents("R0010", depth=1), [gene])
+        self.assertEqual(self.document.dependents("R0010_seq"), [parts[0], gene, device])
+        self.assertEqual(self.document.dependents("BB0001_sequence"), [gene, device])
+        with self.assertRaises(ValueError):
+            self.document.remove_component_definition("R0010", safe=True)
+
+        # Only the changed definition is indexed again
+        device.components = []
+        self.assertEqual(list(self.document._identities._dirty.values()), [device])
+        self.assertEqual(self.document.dependents("R0010"), [gene])
+        self.assertEqual(self.document._identities._dirty, {})
+        self.document.remove_component_definition("BB0002", safe=True)
+        self.assertIsNone(self.document.get_component_definition("BB0002"))
+        device.components = [Component("BB0002/BB0001", gene, 'public')]
+        self.assertEqual(self.document.dependents("R0010"), [gene])
+
+        # Changes to a replaced definition do not bring it back
+        replacement = ComponentDefinition("BB0001")
+        self.document._components["BB0001"] = replacement
+        self.document._index_top_levels([replacement])
+        gene.description = 'replaced'
+        self.assertEqual(self.document.find("BB0001"), (replacement, []))
+
+        self.document.read('./snekbol/tests/valid/toggle.xml')
+        for module_definition in self.document._modules.values():
+            for interaction in module_definition.interactions:
+                for participation in interaction.participations:
+                    uri = participation.participant.identity
+                    self.assertIn(participation, self.document.referrers(uri))
+                    self.assertIn(module_definition, self.document.dependents(uri))
+
+    def test_query(self):
+        self.document.read('./snekbol/tests/valid/toggle.xml')
+        promoter = 'http://identifiers.org/so/SO:0000167'
+        promoters = sorted((d for d in self.document.list_components() if promoter in d.roles),
+                           key=lambda d: d.identity)
+        self.assertTrue(len(promoters) > 0)
+        self.assertEqual(self.document.query(ComponentDefinition, role='Promoter'), promoters)
+        self.assertEqual(self.document.query(ComponentDefinition, role=promoter), promoters)
+        self.assertEqual(self.document.query(ComponentDefinition, role=['Promoter', 'CDS'],
+                                             type='DNA'),
+                         self.document.query(ComponentDefinition, role=['CDS', 'Promoter']))
+        self.assertEqual(self.document.query(Sequence, encoding='DNA'),
+                         sorted(self.document._sequences.values(), key=lambda s: s.identity))
+        self.assertEqual(len(self.document.query(annotation='http://sbolhub.org/purpose')), 1)
+        self.assertEqual(self.document.query(SequenceAnnotation, role='Promoter'), [])
+        with self.assertRaises(ValueError):
+            self.document.query(colour='red')
+
+        definition = promoters[0]
+        definition.roles = ['CDS']
+        self.assertNotIn(definition, self.document.query(role='Promoter'))
+        self.assertIn(definition, self.document.query(role='CDS'))
+        self.document.remove_component_definition(definition.identity)
+        self.assertNotIn(definition, self.document.query(role='CDS'))
+
+        sequence = next(iter(self.document.list_sequences()))
+        sequence.encoding = 'Protein'
+        self.assertNotIn(sequence, self.document.query(Sequence, encoding='DNA'))
+        self.assertIn(sequence, self.document.query(Sequence, encoding='Protein'))
+
+    def test_search_sequences(self):
+        self.document.read('./snekbol/tests/valid/BBa_T9002.xml', engine='stream')
+        hits = self.document.search_sequences('TACTAGAG')
+        self.assertTrue(len(hits) > 0)
+        for identity, position, strand in hits:
+            elements = str(self.document._sequences[identity].elements)
+            self.assertEqual(elements[position - 1:position + 7],
+                             'tactagag' if strand == '+' else 'ctctagta')
+
+        sequence = next(iter(self.document._sequences.values()))
+        sequence.elements = 'ggtctcnnnnnGAGACC'
+        self.assertIn((str(sequence.identity), 1, '+'), self.document.search_sequences('ggtctc'))
+        self.assertIn((str(sequence.identity), 12, '-'), self.document.search_sequences('ggtctc'))
+        self.document.clear_document()
+        self.assertEqual(self.document.search_sequences('ggtctc'), [])
+
+    def test_get_model_and_module_definition(self):
+        self.document.read('./snekbol/tests/valid/toggle.xml')
+        for uri, module_definition in self.document._modules.items():
+            self.assertIs(self.document.get_module_definition(uri), module_definition)
+            self.document.remove_module_definition(uri)
+            self.assertIsNone(self.document.get_module_definition(uri))
+            self.assertIsNone(self.document.find(uri))
+            self.document.add_module_definition(module_definition)
+            self.assertIs(self.document.find(uri)[0], module_definition)
+            break
+        self.assertIsNone(self.document.get_model('http://example.org/sbol/missing'))
+
     def test_read_valid(self):
         for file_path in os.listdir('./snekbol/tests/valid'):
             if file_path.endswith('xml'):
                 with open('./snekbol/tests/valid/'+file_path) as rf:
                     doc = Document('https://example.org/sbol/')
                     doc.read(rf)
+
+    def test_read_stream_engine(self):
+        for file_name in ['toggle.xml', 'BBa_T9002.xml', 'labhost_Escherichia_Coli.xml']:
+            with open('./snekbol/tests/valid/' + file_name) as rf:
+                graph_doc = Document('https://example.org/sbol/')
+                graph_doc.read(rf)
+            with open('./snekbol/tests/valid/' + file_name) as rf:
+                stream_doc = Document('https://example.org/sbol/')
+                stream_doc.read(rf, engine='stream')
+            for store in ['_components', '_sequences', '_models', '_modules',
+                          '_collections', '_annotations']:
+                self.assertEqual(set(getattr(graph_doc, store)), set(getattr(stream_doc, store)))
+            for uri, collection in graph_doc._collections.items():
+                self.assertEqual(sorted(m.identity for m in collection.members),
+                                 sorted(m.identity for m in stream_doc._collections[uri].members))
+
+    def test_write_matches_whole_tree(self):
+        with open('./snekbol/tests/valid/BBa_T9002.xml') as rf:
+            self.document.read(rf)
+        output = io.BytesIO()
+        self.document.write(output)
+        rdf = ET.Element(NS('rdf', 'RDF'), nsmap=XML_NS)
+        for obj in self.document._top_level_objects():
+            rdf.append(obj._as_rdf_xml(self.document.ns))
+        self.assertEqual(output.getvalue(),
+                         ET.tostring(rdf, pretty_print=True, xml_declaration=True,
+                                     encoding='utf-8'))
+
+        empty = io.BytesIO()
+        Document('https://example.org/sbol/').write(empty)
+        self.assertTrue(empty.getvalue().endswith(b'/>\n'))
+
+    def test_write_cache(self):
+        with open('./snekbol/tests/valid/BBa_T9002.xml') as rf:
+            self.document.read(rf)
+        definitions = [c for c in self.document._components.values() if c.sequence_annotations]
+        location = definitions[0].sequence_annotations[0].locations[0]
+        annotations = [c.annotations for c in self.document._components.values()
+                       if c.annotations][0]
+        sequence = next(iter(self.document.list_sequences()))
+        part = next(c.definition for d in self.document._components.values()
+                    for c in d.components)
+        edits = [lambda: setattr(location, 'display_id', 'changed'),
+                 lambda: definitions[-1].roles.append('http://identifiers.org/so/SO:0000167'),
+                 lambda: definitions[-1].components.pop(),
+                 lambda: setattr(annotations[0].value, 'uri', 'http://example.org/sbol/changed'),
+                 lambda: setattr(annotations[1], 'value', AnnotationValue(literal='changed')),
+                 lambda: setattr(annotations[1].value, 'literal', 'changed again'),
+                 lambda: setattr(sequence, 'identity', sequence.identity + '_renamed'),
+                 lambda: setattr(part, 'identity', part.identity + '_renamed'),
+                 lambda: setattr(location, 'identity', location.identity + '_renamed')]
+        for edit in edits:
+            cached = io.BytesIO()
+            self.document.write(cached, cache=True)
+            edit()
+            cached = io.BytesIO()
+            self.document.write(cached, cache=True)
+            uncached = io.BytesIO()
+            self.document.write(uncached)
+            self.assertEqual(cached.getvalue(), uncached.getvalue())
+
+    def test_assigned_lists_copied(self):
+        interactions = []
+        module_definition = ModuleDefinition('md', interactions=interactions)
+        self.document.add_module_definition(module_definition)
+        cached = io.BytesIO()
+        self.document.write(cached, cache=True)
+
+        # Changes to the assigned list are not seen, changes through the attribute are
+        interaction = Interaction('md/i', ['http://identifiers.org/biomodels.sbo/SBO:0000169'])
+        interactions.append(interaction)
+        self.assertEqual(module_definition.interactions, [])
+        module_definition.interactions.append(interaction)
+        self.assertIsNot(module_definition.interactions, interactions)
+        for cache in [True, False]:
+            output = io.BytesIO()
+            self.document.write(output, cache=cache)
+            self.assertIn(b'md/i', output.getvalue())
+
+    def test_write_workers(self):
+        with open('./snekbol/tests/valid/BBa_T9002.xml') as rf:
+            self.document.read(rf)
+        serial = io.BytesIO()
+        self.document.write(serial)
+        parallel = io.BytesIO()
+        self.document.write(parallel, workers=2)
+        self.assertEqual(serial.getvalue(), parallel.getvalue())
+
+        # Definitions read lazily are sent to workers without the document that read them
+        lazy = Document('http://example.org/sbol/')
+        lazy.read('./snekbol/tests/valid/BBa_T9002.xml', engine='stream', lazy=True)
+        definition = lazy.get_component_definition('http://www.async.ece.utah.edu/BBa_T9002')
+        self.assertFalse(definition.children_loaded)
+        self.assertNotIn(b'Document', pickle.dumps(definition))
+        self.assertTrue(definition.children_loaded)
+        lazy.read('./snekbol/tests/valid/BBa_T9002.xml', engine='stream', lazy=True)
+        parallel = io.BytesIO()
+        lazy.write(parallel, workers=2)
+        serial = io.BytesIO()
+        lazy.write(serial)
+        self.assertEqual(serial.getvalue(), parallel.getvalue())
+
+    def test_identity_cache(self):
+        sequence = Sequence('R0010_seq', 'ggctgca')
+        self.assertEqual(sequence._get_rdf_identity(self.document.ns),
+                         URIRef('http://example.org/sbol/R0010_seq'))
+        sequence.identity = 'B0032_seq'
+        self.assertEqual(sequence._get_rdf_identity(self.document.ns),
+                         URIRef('http://example.org/sbol/B0032_seq'))
+        sequence.identity = 'https://example.org/other/B0032_seq'
+        self.assertEqual(sequence._get_rdf_identity(self.document.ns),
+                         URIRef('https://example.org/other/B0032_seq'))
+
+    def test_compact_objects(self):
+        location = Range('R0010_range', 1, 7)
+        annotation = SequenceAnnotation('R0010_annotation', locations=[location])
+        self.assertFalse(hasattr(location, '__dict__'))
+        self.assertIsNone(annotation._metadata)
+        self.assertIs(annotation._roles, ())
+
+        annotation.roles.append('http://identifiers.org/so/SO:0000167')
+        annotation.name = 'promoter'
+        self.assertEqual(annotation.roles, ['http://identifiers.org/so/SO:0000167'])
+        self.assertEqual(annotation._metadata, {'name': 'promoter'})
+        annotation.name = None
+        self.assertIsNone(annotation._metadata)
+
+        copy = pickle.loads(pickle.dumps(annotation))
+        self.assertEqual(copy.roles, annotation.roles)
+        self.assertEqual(copy.locations[0].end, 7)
+        self.assertIs(copy.locations[0]._parent, copy)
+
+    def test_empty_list_attributes(self):
+        definition = ComponentDefinition('BB0001', types=[], roles=[], sequences=[],
+                                         components=[], sequence_annotations=[],
+                                         sequence_constraints=[], annotations=[])
+        functional = FunctionalComponent('fc', definition, 'public', 'in', maps_to=[])
+        objects = {
+            definition: ['roles', 'sequences', 'components', 'sequence_annotations',
+                         'sequence_constraints', 'annotations'],
+            Component('c', definition, 'public', roles=[], maps_to=[]): ['roles', 'maps_to'],
+            functional: ['maps_to'],
+            ModuleDefinition('md', roles=[], modules=[], functional_components=[],
+                             interactions=[], models=[]): ['roles', 'modules',
+                                                           'functional_components',
+                                                           'interactions', 'models'],
+            Module('m', definition, maps_to=[]): ['maps_to'],
+            Interaction('i', [], participations=[]): ['types', 'participations'],
+            Participation('p', [], functional): ['roles'],
+            SequenceAnnotation('sa', []): ['locations', 'roles'],
+            Collection('col', members=[]): ['members'],
+        }
+        for obj, names in objects.items():
+            for name in names:
+                getattr(obj, name).append('http://example.org/sbol/value')
+                self.assertEqual(getattr(obj, name), ['http://example.org/sbol/value'])
+
+    def test_uri_table(self):
+        table = URITable()
+        uri = table.intern(URIRef('http://example.org/sbol/R0010'))
+        self.assertIs(type(uri), str)
+        self.assertIs(table.intern('http://example.org/sbol/R0010'), uri)
+        table.intern(URIRef('http://example.org/sbol/R0011'))
+        table.prune()
+        self.assertEqual(len(table), 1)
+        self.assertIn(uri, table)
+
+        with open('./snekbol/tests/valid/BBa_T9002.xml') as rf:
+            self.document.read(rf)
+        types = {}
+        for definition in self.document._components.values():
+            for t in definition.types:
+                self.assertIs(types.setdefault(t, t), t)
+
+    def test_read_missing_sequence(self):
+        # The sequence is referred to but not written, as it is not in the document
+        definition = ComponentDefinition('R0010', sequences=[Sequence('R0010_seq', 'ggctgca')])
+        self.document.add_component_definition(definition)
+        written = io.BytesIO()
+        self.document.write(written)
+        self.assertIn(b'R0010_seq', written.getvalue())
+        for engine in ['rdflib', 'stream']:
+            doc = Document('http://example.org/sbol/')
+            doc.read(io.BytesIO(written.getvalue()), engine=engine)
+            self.assertEqual(doc.get_component_definition('http://example.org/sbol/R0010')
+                             .sequences, [])
+
+    def test_read_unknown_engine(self):
+        with self.assertRaises(ValueError):
+            self.document.read('./snekbol/tests/valid/toggle.xml', engine='other')
+
+    def test_subject_index_from_graph(self):
+        graph = Graph()
+        graph.parse('./snekbol/tests/valid/toggle.xml', format='xml')
+        index = SubjectIndex.from_graph(graph)
+        self.assertEqual(len(index), len(graph))
+        for s, p, o in graph.triples((None, RDF.type, SBOL.ComponentDefinition)):
+            self.assertIn((s, p, o), index)
+            self.assertEqual(index.value(s, SBOL.displayId), graph.value(s, SBOL.displayId))
+        self.assertEqual(set(index.triples((None, RDF.type, SBOL.Sequence))),
+                         set(graph.triples((None, RDF.type, SBOL.Sequence))))
+
+    def test_namespace_resolver(self):
+        resolver = NamespaceResolver({'sbol': 'http://sbols.org/v2#',
+                                      'igem': 'http://parts.igem.org/#'})
+        self.assertEqual(resolver.resolve(SBOL.displayId),
+                         ('http://sbols.org/v2#', 'displayId', 'sbol', True))
+        self.assertEqual(resolver.resolve(URIRef('http://parts.igem.org/#status')),
+                         ('http://parts.igem.org/#', 'status', 'igem', False))
+        resolver.add('parts', 'http://parts.igem.org/#')
+        self.assertEqual(resolver.resolve(URIRef('http://parts.igem.org/#status'))[2], 'parts')
+
+    def test_read_many(self):
+        paths = ['./snekbol/tests/valid/toggle.xml', './snekbol/tests/valid/BBa_T9002.xml']
+        expected = Document('https://example.org/sbol/')
+        for path in paths:
+            with open(path) as rf:
+                doc = Document('https://example.org/sbol/')
+                doc.read(rf)
+            expected._merge_document(doc)
+
+        self.document.read_many(paths, workers=2)
+        self.assertEqual(set(self.document._components), set(expected._components))
+        self.assertEqual(set(self.document._sequences), set(expected._sequences))
+        self.assertEqual(set(self.document._modules), set(expected._modules))
+
+        read_paths = [path for path, doc in self.document.iter_read_many(paths, workers=2)]
+        self.assertEqual(sorted(read_paths), sorted(paths))
+
+    def test_pickle_without_indexes(self):
+        self.document.read('./snekbol/tests/valid/toggle.xml')
+        state = self.document.__getstate__()
+        for name in ['_identities', '_uris', '_contents']:
+            self.assertNotIn(name, state)
+
+        copy = pickle.loads(pickle.dumps(self.document))
+        uri = 'http://www.virtualparts.org/part/pIKE_Toggle_1'
+        annotation, parents = copy.find(uri + '/anno1')
+        self.assertEqual(parents, [copy.get_component_definition(uri)])
+        self.assertIn(annotation, parents[0].sequence_annotations)
+        self.assertEqual(len(copy._contents),
+                         len({str(s.elements) for s in copy.list_sequences()}))
+
+    def test_read_many_duplicate_identity(self):
+        paths = ['./snekbol/tests/valid/toggle.xml', './snekbol/tests/valid/toggle.xml']
+        with self.assertRaises(ValueError):
+            self.document.read_many(paths, workers=1)
+
+    def _write_append_files(self, directory):
+        promoter = ComponentDefinition('R0010', roles=['Promoter'], version='1')
+        parts = Document('http://example.org/sbol/')
+        parts.add_component_definition(promoter)
+        parts_path = os.path.join(directory, 'parts.xml')
+        with open(parts_path, 'wb') as wf:
+            parts.write(wf)
+
+        gene = ComponentDefinition('BB0001')
+        gene.components = [Component('http://example.org/sbol/BB0001/R0010', promoter, 'public')]
+        design = Document('http://example.org/sbol/')
+        design.add_component_definition(gene)
+        design_path = os.path.join(directory, 'design.xml')
+        with open(design_path, 'wb') as wf:
+            design.write(wf)
+        return parts_path, design_path
+
+    def test_append_resolves_references(self):
+        with tempfile.TemporaryDirectory() as directory:
+            parts_path, design_path = self._write_append_files(directory)
+            for engine in ['rdflib', 'stream']:
+                doc = Document('http://example.org/sbol/')
+                with open(parts_path) as rf:
+                    doc.append(rf, engine=engine)
+                with open(design_path) as rf:
+                    doc.append(rf, engine=engine)
+                promoter = doc.get_component_definition('http://example.org/sbol/R0010')
+                gene = doc.get_component_definition('http://example.org/sbol/BB0001')
+                self.assertEqual(len(doc._components), 2)
+                self.assertIs(gene.components[0].definition, promoter)
+
+    def test_append_conflicts(self):
+        with tempfile.TemporaryDirectory() as directory:
+            parts_path, design_path = self._write_append_files(directory)
+            uri = 'http://example.org/sbol/R0010'
+            with open(parts_path) as rf:
+                self.document.append(rf)
+            existing = self.document.get_component_definition(uri)
+
+            with self.assertRaises(ValueError):
+                with open(parts_path) as rf:
+                    self.document.append(rf)
+            with open(parts_path) as rf:
+                self.document.append(rf, on_conflict='skip')
+            self.assertIs(self.document.get_component_definition(uri), existing)
+            with open(parts_path) as rf:
+                self.document.append(rf, on_conflict='newest')
+            self.assertIs(self.document.get_component_definition(uri), existing)
+            with open(parts_path) as rf:
+                self.document.append(rf, on_conflict='replace')
+            self.assertIsNot(self.document.get_component_definition(uri), existing)
+            self.assertEqual(len(self.document._components), 1)
+
+    def test_read_lazy_children(self):
+        for engine in ['rdflib', 'stream']:
+            with open('./snekbol/tests/valid/BBa_T9002.xml') as rf:
+                eager = Document('https://example.org/sbol/')
+                eager.read(rf, engine=engine)
+            with open('./snekbol/tests/valid/BBa_T9002.xml') as rf:
+                lazy = Document('https://example.org/sbol/')
+                lazy.read(rf, engine=engine, lazy=True)
+            for uri, definition in eager._components.items():
+                lazy_definition = lazy._components[uri]
+                self.assertFalse(lazy_definition.children_loaded)
+                # Loaders keep only the triples of their own children, not the sequences
+                loader_graph = lazy_definition._children_loader.args[0]
+                self.assertFalse(any(SBOL.elements in loader_graph.properties(s)
+                                     for s in loader_graph._subjects))
+                self.assertEqual(sorted(c.identity for c in definition.components),
+                                 sorted(c.identity for c in lazy_definition.components))
+                self.assertTrue(lazy_definition.children_loaded)
+                self.assertEqual(len(definition.sequence_annotations),
+                                 len(lazy_definition.sequence_annotations))
+
+    def test_read_lazy_children_replaced(self):
+        with open('./snekbol/tests/valid/BBa_T9002.xml') as rf:
+            self.document.read(rf, lazy=True)
+        definition = self.document.get_component_definition('http://www.async.ece.utah.edu/BBa_T9002')
+        definition.components = []
+        self.assertEqual(definition.components, [])
+        self.assertTrue(len(definition.sequence_annotations) > 0)
+
+    def test_read_snapshot_cache(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            with open('./snekbol/tests/valid/toggle.xml') as rf:
+                self.document.read(rf, cache_dir=cache_dir)
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+            cached = Document('https://example.org/sbol/')
+            with open('./snekbol/tests/valid/toggle.xml') as rf:
+                cached.read(rf, cache_dir=cache_dir)
+            self.assertEqual(set(cached._components), set(self.document._components))
+            self.assertEqual(set(cached._modules), set(self.document._modules))
+            self.assertEqual(cached._namespaces, self.document._namespaces)
+
+            with open('./snekbol/tests/valid/toggle.xml') as rf:
+                text = rf.read()
+            for _ in range(2):
+                streamed = Document('https://example.org/sbol/')
+                streamed.read(io.StringIO(text), cache_dir=cache_dir)
+                self.assertEqual(set(streamed._components), set(self.document._components))
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+
+    def test_snapshot_invalidated_by_version(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            path = os.path.join(cache_dir, 'key.snapshot')
+            snapshot.save_snapshot(path, {'value': 1})
+            self.assertEqual(snapshot.load_snapshot(path), {'value': 1})
+            version = snapshot.__version__
+            snapshot.__version__ = version + '.dev'
+            try:
+                self.assertIsNone(snapshot.load_snapshot(path))
+            finally:
+                snapshot.__version__ = version
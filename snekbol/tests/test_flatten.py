@@ -0,0 +1,88 @@
+import unittest
+
+from snekbol.componentdefinition import ComponentDefinition
+from snekbol.document import Document
+from snekbol.components import Component
+from snekbol.location import Range
+from snekbol.sequence import Sequence, SequenceAnnotation
+from snekbol.flatten import flatten_sequence, flatten_sequences, reverse_complement
+
+
+def _place(definition, parts):
+    """
+    Place (part, start, orientation) in definition with a Component and SequenceAnnotation each
+    """
+    for part, start, orientation in parts:
+        identity = '{}/{}'.format(definition.identity, part.identity)
+        component = Component(identity, part, 'public')
+        definition.components.append(component)
+        location = Range(identity + '/range', start, start + 1, orientation=orientation)
+        definition.sequence_annotations.append(
+            SequenceAnnotation(identity + '/annotation', [location], component=component))
+
+
+class FlattenTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.promoter = ComponentDefinition('R0010', sequences=[Sequence('R0010_seq', 'ggctgca')])
+        self.cds = ComponentDefinition('E0040', sequences=[Sequence('E0040_seq', 'atgtaa')])
+        self.terminator = ComponentDefinition('B0012',
+                                              sequences=[Sequence('B0012_seq', 'attcga')])
+        self.gene = ComponentDefinition('BB0001')
+        _place(self.gene, [(self.cds, 20, None), (self.promoter, 1, None)])
+        self.device = ComponentDefinition('BB0002')
+        _place(self.device, [(self.gene, 1, None),
+                             (self.terminator, 40, 'http://sbols.org/v2#reverseComplement')])
+
+    def test_reverse_complement(self):
+        self.assertEqual(reverse_complement('aaCGtnRy'), 'rYnaCGtt')
+
+    def test_flatten(self):
+        self.assertEqual(flatten_sequence(self.gene), 'ggctgcaatgtaa')
+        self.assertEqual(flatten_sequence(self.device), 'ggctgcaatgtaa' + 'tcgaat')
+        self.assertIsNone(flatten_sequence(ComponentDefinition('empty')))
+
+        cached = self.gene._flattened
+        flatten_sequence(self.device)
+        self.assertIs(self.gene._flattened, cached)
+
+        self.promoter.sequences[0].elements = 'tttacg'
+        self.assertEqual(flatten_sequence(self.device), 'tttacgatgtaa' + 'tcgaat')
+        self.gene.sequence_annotations[1].locations[0].start = 30
+        self.assertEqual(flatten_sequence(self.device), 'atgtaatttacg' + 'tcgaat')
+
+    def test_flatten_sequences(self):
+        flattened = flatten_sequences([self.device, self.gene, self.promoter])
+        self.assertEqual(flattened, {'BB0002': 'ggctgcaatgtaatcgaat',
+                                     'BB0001': 'ggctgcaatgtaa',
+                                     'R0010': 'ggctgca'})
+
+    def test_missing_and_cyclic(self):
+        self.cds.sequences = []
+        self.gene.sequences = [Sequence('BB0001_seq', 'nnnn')]
+        self.assertEqual(flatten_sequence(self.gene), 'nnnn')
+        self.cds.sequences = [Sequence('E0040_seq', 'atg')]
+        self.assertEqual(flatten_sequence(self.gene), 'ggctgcaatg')
+
+        _place(self.promoter, [(self.device, 1, None)])
+        with self.assertRaises(ValueError):
+            flatten_sequence(self.device)
+
+    def test_flatten_read(self):
+        for engine in ['rdflib', 'stream']:
+            for lazy in [False, True]:
+                doc = Document('http://example.org/sbol/')
+                doc.read('./snekbol/tests/valid/BBa_T9002.xml', engine=engine, lazy=lazy)
+                definition = doc.get_component_definition('http://www.async.ece.utah.edu/BBa_T9002')
+                sequence = doc._sequences['http://www.async.ece.utah.edu/partseq_5591']
+                self.assertEqual(definition.sequences, [sequence])
+                self.assertEqual(flatten_sequence(definition), sequence.elements)
+
+        # Designs built from their parts match the sequences stored for them
+        doc = Document('http://example.org/sbol/')
+        doc.read('./snekbol/tests/valid/pIKE_pTAK_toggle_switches.xml')
+        flattened = flatten_sequences(doc.list_components())
+        self.assertEqual(len(flattened), 77)
+        for definition in doc.list_components():
+            self.assertEqual(flattened[definition.identity].lower(),
+                             str(definition.sequences[0].elements).lower())
@@ -0,0 +1,51 @@
+import random
+import unittest
+
+from snekbol.intervals import IntervalIndex
+from snekbol.componentdefinition import ComponentDefinition
+from snekbol.location import Range, Cut
+from snekbol.sequence import SequenceAnnotation
+
+
+class IntervalIndexTestCase(unittest.TestCase):
+
+    def test_matches_scan(self):
+        rng = random.Random(7)
+        intervals = []
+        for i in range(300):
+            start = rng.randint(1, 1000)
+            intervals.append((start, start + rng.randint(0, 60), i))
+        index = IntervalIndex(intervals)
+        for _ in range(200):
+            start = rng.randint(-10, 1100)
+            end = start + rng.randint(0, 40)
+            expected = sorted((i for i in intervals if i[0] <= end and i[1] >= start),
+                              key=lambda i: (i[0], i[1]))
+            self.assertEqual(sorted(index.overlapping(start, end)),
+                             sorted(i[2] for i in expected))
+            nearest = index.nearest(start)
+            distance = min(max(0, i[0] - start, start - i[1]) for i in intervals)
+            interval = intervals[nearest]
+            self.assertEqual(max(0, interval[0] - start, start - interval[1]), distance)
+
+    def test_empty(self):
+        index = IntervalIndex([])
+        self.assertEqual(index.overlapping(1, 10), [])
+        self.assertIsNone(index.nearest(5))
+
+    def test_component_definition(self):
+        promoter = SequenceAnnotation('promoter', locations=[Range('promoter/range', 1, 7)])
+        rbs = SequenceAnnotation('rbs', locations=[Range('rbs/range', '8', '18')])
+        site = SequenceAnnotation('site', locations=[Cut('site/cut', 30)])
+        definition = ComponentDefinition('BB0001', sequences=[],
+                                         sequence_annotations=[promoter, rbs])
+        self.assertEqual(definition.overlapping(5, 9), [promoter, rbs])
+        self.assertEqual(definition.containing(12), [rbs])
+        self.assertEqual(definition.nearest(25), rbs)
+
+        definition.sequence_annotations.append(site)
+        self.assertEqual(definition.nearest(25), site)
+        rbs.locations[0].end = 40
+        self.assertEqual(definition.containing(35), [rbs])
+        definition.sequence_annotations.remove(rbs)
+        self.assertEqual(definition.containing(35), [])
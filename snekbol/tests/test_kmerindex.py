@@ -0,0 +1,75 @@
+import random
+import re
+import unittest
+
+from snekbol.kmerindex import KmerIndex, IUPAC_CODES, motif_pattern
+from snekbol.flatten import reverse_complement
+from snekbol.packed import PackedSequence
+from snekbol.sequence import Sequence
+from snekbol.sequencestore import MappedSequenceStore
+
+
+def _scan(sequences, motif):
+    hits = []
+    for strand, strand_motif in (('+', motif), ('-', reverse_complement(motif))):
+        pattern = re.compile('(?=(?:{}))'.format(motif_pattern(strand_motif).pattern), re.I)
+        for identity, elements in sequences.items():
+            hits.extend((identity, m.start() + 1, strand) for m in pattern.finditer(elements))
+    return sorted(hits)
+
+
+class KmerIndexTestCase(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(11)
+        self.sequences = {'seq{}'.format(i): ''.join(rng.choice('acgt')
+                                                     for _ in range(rng.randint(0, 400)))
+                          for i in range(40)}
+        self.index = KmerIndex(k=6)
+        for identity, elements in self.sequences.items():
+            self.index.add(identity, elements)
+        self.rng = rng
+
+    def test_matches_scan(self):
+        codes = 'acgt' * 6 + ''.join(IUPAC_CODES)
+        for _ in range(200):
+            motif = ''.join(self.rng.choice(codes) for _ in range(self.rng.randint(1, 12)))
+            self.assertEqual(self.index.search(motif), _scan(self.sequences, motif), motif)
+
+    def test_strands(self):
+        index = KmerIndex(k=4)
+        index.add('seq', 'ttGAATTCggatccaaa')
+        self.assertEqual(index.search('gaattc'), [('seq', 3, '+'), ('seq', 3, '-')])
+        self.assertEqual(index.search('GGATCCAA'), [('seq', 9, '+')])
+        self.assertEqual(index.search('ttggatcc'), [('seq', 9, '-')])
+        self.assertEqual(index.search('aaa'), [('seq', 15, '+')])
+        with self.assertRaises(ValueError):
+            index.search('gaxttc')
+
+    def test_remove_and_sync(self):
+        self.index.remove('seq3')
+        del self.sequences['seq3']
+        self.assertNotIn('seq3', self.index)
+        self.assertEqual(self.index.search('acgtw'), _scan(self.sequences, 'acgtw'))
+
+        sequences = [Sequence(identity, elements)
+                     for identity, elements in list(self.sequences.items())[:5]]
+        sequences[0].elements = PackedSequence('ggggaattcgggg')
+        self.index.sync(sequences)
+        self.assertEqual(len(self.index), 5)
+        expected = {s.identity: str(s.elements) for s in sequences}
+        self.assertEqual(self.index.search('gaattc'), _scan(expected, 'gaattc'))
+        self.assertEqual(self.index.search('nnnnnnnn'), _scan(expected, 'nnnnnnnn'))
+
+    def test_chunks(self):
+        store = MappedSequenceStore(threshold=1)
+        self.addCleanup(store.close)
+        index = KmerIndex(k=6, chunk_size=7)
+        for number, (identity, elements) in enumerate(self.sequences.items()):
+            stored = [elements, PackedSequence(elements), store.add(elements)][number % 3]
+            index.add(identity, stored)
+        self.assertEqual(sorted(index._postings), sorted(self.index._postings))
+        for kmer, postings in self.index._postings.items():
+            self.assertEqual(sorted(index._postings[kmer]), sorted(postings))
+        for motif in ['gaattc', 'acg', 'nnnnn', 'nnnnnnnnnnn', 'acgtnnnnnnnnnnnnacg', 'ggcc' * 5]:
+            self.assertEqual(index.search(motif), _scan(self.sequences, motif), motif)
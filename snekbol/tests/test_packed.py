@@ -0,0 +1,61 @@
+import io
+import unittest
+from collections import Counter
+
+from snekbol.document import Document
+from snekbol.componentdefinition import ComponentDefinition
+from snekbol.sequence import Sequence
+from snekbol.packed import PackedSequence, np
+
+
+@unittest.skipIf(np is None, 'NumPy is not installed')
+class PackedSequenceTestCase(unittest.TestCase):
+
+    def test_round_trip(self):
+        for elements in ['', 'a', 'ggctgca', 'ACGTRYNacgt', 'uuaacgnu', 'acgt' * 50 + 'n']:
+            packed = PackedSequence(elements)
+            self.assertEqual(str(packed), elements)
+            self.assertEqual(len(packed), len(elements))
+            self.assertEqual(packed.counts(), dict(Counter(elements)))
+            self.assertEqual(packed, elements)
+
+    def test_slicing(self):
+        elements = 'aattatataaaNNacgtRY'
+        packed = PackedSequence(elements)
+        for start in range(len(elements)):
+            self.assertEqual(packed[start], elements[start])
+            for stop in range(start, len(elements) + 1):
+                self.assertEqual(str(packed[start:stop]), elements[start:stop])
+        self.assertEqual(packed[::2], elements[::2])
+        self.assertEqual(packed[-3:], elements[-3:])
+
+    def test_concatenate(self):
+        parts = ['ggctgca', PackedSequence('aattatataaa'), PackedSequence('atgNaa'), 'ATTCGA']
+        joined = PackedSequence.concatenate(parts)
+        self.assertEqual(str(joined), ''.join(str(p) for p in parts))
+
+    def test_sequence_pack(self):
+        sequence = Sequence('R0010_seq', 'ggctgca' * 100)
+        sequence.pack()
+        self.assertTrue(sequence.is_packed)
+        self.assertEqual(str(sequence.elements), 'ggctgca' * 100)
+        protein = Sequence('E0040_protein', 'MSKGEELFTG' * 100, encoding='Protein')
+        protein.pack()
+        self.assertFalse(protein.is_packed)
+
+    def test_assemble_packed(self):
+        outputs = []
+        for pack in [False, True]:
+            doc = Document('http://example.org/sbol/', pack_sequences=pack)
+            gene = ComponentDefinition('BB0001', sequences=[])
+            promoter = ComponentDefinition('R0010', sequences=[Sequence('R0010_seq', 'ggctgca')])
+            rbs = ComponentDefinition('B0032', sequences=[Sequence('B0032_seq', 'aattatataaa')])
+            for definition in [gene, promoter, rbs]:
+                doc.add_component_definition(definition)
+            doc.assemble_component(gene, [promoter, rbs])
+            self.assertEqual(gene.sequences[0].is_packed, pack)
+            self.assertEqual(str(gene.sequences[0].elements), 'ggctgcaaattatataaa')
+            output = io.BytesIO()
+            doc.write(output)
+            outputs.append(output.getvalue())
+        self.assertEqual(outputs[0], outputs[1])
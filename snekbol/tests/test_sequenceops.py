@@ -0,0 +1,74 @@
+import random
+import unittest
+
+import numpy as np
+
+from snekbol.packed import PackedSequence
+from snekbol.sequence import Sequence
+from snekbol import sequenceops
+
+
+class SequenceOpsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(5)
+        self.sequences = [Sequence('seq{}'.format(i), ''.join(rng.choice('acgtACGTnry')
+                                                              for _ in range(rng.randint(0, 90))))
+                          for i in range(30)]
+
+    def test_reverse_complement(self):
+        self.assertEqual(sequenceops.reverse_complement('aaCGtnRy'), 'rYnaCGtt')
+        for sequence in self.sequences:
+            expected = sequenceops.reverse_complement(str(sequence.elements))
+            self.assertEqual(sequenceops.reverse_complement(sequence), expected)
+            packed = sequenceops.reverse_complement(PackedSequence(sequence.elements))
+            self.assertIsInstance(packed, PackedSequence)
+            self.assertEqual(str(packed), expected)
+            array = sequenceops.reverse_complement(sequenceops.as_array(sequence))
+            self.assertEqual(array.tobytes().decode('ascii'), expected)
+        self.assertEqual(sequenceops.reverse_complements(self.sequences),
+                         {s.identity: sequenceops.reverse_complement(s) for s in self.sequences})
+
+    def test_reverse_complement_rna(self):
+        for elements, expected in [('AUGC', 'GCAU'), ('GaAGaUg', 'cAuCUuC'), ('ACGTu', 'aACGT')]:
+            self.assertEqual(sequenceops.reverse_complement(elements), expected)
+            self.assertEqual(str(sequenceops.reverse_complement(PackedSequence(elements))),
+                             expected)
+            array = sequenceops.reverse_complement(sequenceops.as_array(elements))
+            self.assertEqual(array.tobytes().decode('ascii'), expected)
+        sequences = [Sequence('rna', 'AUGC'), Sequence('dna', 'ATGC')]
+        self.assertEqual(sequenceops.reverse_complements(sequences),
+                         {'rna': 'GCAU', 'dna': 'GCAT'})
+
+    def test_gc_content(self):
+        self.assertEqual(sequenceops.gc_content('gsCAtN'), 0.5)
+        self.assertEqual(sequenceops.gc_content(''), 0.0)
+        contents = sequenceops.gc_contents(self.sequences)
+        for sequence in self.sequences:
+            elements = sequence.elements
+            expected = sequenceops.gc_content(elements)
+            self.assertAlmostEqual(contents[sequence.identity], expected)
+            self.assertAlmostEqual(sequenceops.gc_content(PackedSequence(elements)), expected)
+        np.testing.assert_allclose(sequenceops.windowed_content('ggccaatt', 4, step=2),
+                                   [1.0, 0.5, 0.0])
+        self.assertEqual(len(sequenceops.windowed_content('acg', 4)), 0)
+
+    def test_invalid_positions(self):
+        self.assertEqual(sequenceops.invalid_positions('acgXt-'), [3])
+        protein = Sequence('protein', 'MKV*Z1', encoding='Protein')
+        self.assertEqual(sequenceops.invalid_positions(protein), [5])
+        self.assertEqual(sequenceops.invalid_positions('C1=CC', 'SmallMolecule'), [])
+        sequences = self.sequences + [protein, Sequence('bad', 'acgtEacgtJ')]
+        self.assertEqual(sequenceops.invalid_sequences(sequences), {'protein': [5],
+                                                                    'bad': [4, 9]})
+
+    def test_translate(self):
+        self.assertEqual(sequenceops.translate('ATGGCCTAAGGGt'), 'MA*G')
+        self.assertEqual(sequenceops.translate('augGCCuaaGGG', to_stop=True), 'MA')
+        self.assertEqual(sequenceops.translate('cATGNCC', frame=1), 'MX')
+        translations = sequenceops.translations(self.sequences, frame=2)
+        for sequence in self.sequences:
+            self.assertEqual(translations[sequence.identity],
+                             sequenceops.translate(sequence, frame=2))
+        with self.assertRaises(ValueError):
+            sequenceops.translate('atg', table='M')
@@ -0,0 +1,54 @@
+import io
+import pickle
+import unittest
+
+from snekbol.document import Document
+from snekbol.componentdefinition import ComponentDefinition
+from snekbol.sequence import Sequence
+from snekbol.sequencestore import MappedSequenceStore
+
+
+class MappedSequenceStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.store = MappedSequenceStore(threshold=10)
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_view(self):
+        first = self.store.add('ggctgca' * 10)
+        second = self.store.add(['aattatataaa', first, 'NN'])
+        self.assertEqual(str(first), 'ggctgca' * 10)
+        self.assertEqual(str(second), 'aattatataaa' + 'ggctgca' * 10 + 'NN')
+        self.assertEqual(len(second), 83)
+        self.assertEqual(second[0], 'a')
+        self.assertEqual(second[-1], 'N')
+        self.assertEqual(second[11:18], 'ggctgca')
+        self.assertEqual(first.count('g'), 30)
+        self.assertEqual(''.join(first.iter_chunks(4)), str(first))
+        self.assertEqual(first, 'ggctgca' * 10)
+        self.assertEqual(pickle.loads(pickle.dumps(first)), 'ggctgca' * 10)
+
+    def test_read_write(self):
+        outputs = []
+        for store in [None, self.store]:
+            doc = Document('https://example.org/sbol/', sequence_store=store)
+            with open('./snekbol/tests/valid/BBa_T9002.xml') as rf:
+                doc.read(rf, engine='stream')
+            output = io.BytesIO()
+            doc.write(output)
+            outputs.append(output.getvalue())
+        self.assertTrue(any(s.is_mapped for s in doc._sequences.values()))
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_assemble(self):
+        doc = Document('http://example.org/sbol/', sequence_store=self.store)
+        gene = ComponentDefinition('BB0001', sequences=[])
+        promoter = ComponentDefinition('R0010', sequences=[Sequence('R0010_seq', 'ggctgca')])
+        rbs = ComponentDefinition('B0032', sequences=[Sequence('B0032_seq', 'aattatataaa')])
+        for definition in [gene, promoter, rbs]:
+            doc.add_component_definition(definition)
+        doc.assemble_component(gene, [promoter, rbs])
+        self.assertTrue(gene.sequences[0].is_mapped)
+        self.assertEqual(str(gene.sequences[0].elements), 'ggctgcaaattatataaa')
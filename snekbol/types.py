@@ -1,4 +1,4 @@
-import validators
+from .uri import is_url
 
 # Convience checkers
 def checktype(value, type_list, is_list=False):
@@ -8,7 +8,7 @@ def checktype(value, type_list, is_list=False):
             try:
                 item.append(type_list[v])
             except KeyError as err:
-                if not validators.url(v):
+                if not is_url(v):
                     #raise KeyError('{0} is not a valid URI/lookup type'.format(v)) from err
                     err.args = ('"{0}" is not a valid URI/lookup type'.format(v),)
                     raise
@@ -17,7 +17,7 @@ def checktype(value, type_list, is_list=False):
         try:
             item = type_list[value]
         except KeyError as err:
-            if not validators.url(value):
+            if not is_url(value):
                 err.args = ('{0} is not a valid URI/lookup type'.format(value),)
                 raise
             item = value
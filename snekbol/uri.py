@@ -1,3 +1,8 @@
+from functools import lru_cache
+
+import validators
+
+
 class URI(object):
     """
     A helper class to work with URI's
@@ -6,3 +11,22 @@ class URI(object):
         # The thing that is being described
         self.resource = resource
         self.location = location
+
+
+def is_url(value):
+    """
+    Whether value is a URL
+    """
+    # The validator only accepts scheme://authority and file: URLs, checking for these first
+    # keeps it, and its cache, clear of the many relative identities only checked once
+    if isinstance(value, str) and '://' not in value and value[:5].lower() != 'file:':
+        return False
+    return _validate_url(value)
+
+
+@lru_cache(maxsize=1 << 16)
+def _validate_url(value):
+    """
+    Memoised as the same identities and types are checked many times
+    """
+    return bool(validators.url(value))
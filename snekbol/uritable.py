@@ -0,0 +1,49 @@
+import sys
+
+# Number of URIs the table holds before it is first pruned, see URITable.prune
+PRUNE_SIZE = 4096
+
+
+class URITable(object):
+    """
+    Intern table for the URIs of a document
+
+    Each URI is kept once as a str, so objects read from a file share one copy of every
+    identity, type and role URI. URIs no longer used by anything else are pruned as the table
+    grows.
+    """
+    def __init__(self):
+        self._uris = {}
+        self._prune_size = PRUNE_SIZE
+
+    def __len__(self):
+        return len(self._uris)
+
+    def __contains__(self, uri):
+        return uri in self._uris
+
+    def intern(self, uri):
+        """
+        The shared copy of uri, added to the table if it is not there yet
+        """
+        # rdflib terms do not compare equal to str, so the table only holds plain str
+        if type(uri) is not str:
+            uri = str.__str__(uri)
+        shared = self._uris.get(uri)
+        if shared is None:
+            if len(self._uris) >= self._prune_size:
+                self.prune()
+                self._prune_size = max(PRUNE_SIZE, 2 * len(self._uris))
+            self._uris[uri] = shared = uri
+        return shared
+
+    def prune(self):
+        """
+        Drop the URIs held by nothing but this table
+        """
+        # Such a URI is only referred to by its key and value, the loop and getrefcount
+        self._uris = {uri: uri for uri in self._uris if sys.getrefcount(uri) > 4}
+
+    def clear(self):
+        self._uris.clear()
+        self._prune_size = PRUNE_SIZE